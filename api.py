@@ -0,0 +1,248 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+from collections import defaultdict
+from datetime import datetime
+from flask import Blueprint, jsonify, request, url_for, abort
+from werkzeug.exceptions import HTTPException
+from replicas import use_replica
+from models import db, Venue, Artist, Show, Location, Genre, venues_genres, artists_genres
+
+#----------------------------------------------------------------------------#
+# JSON API.
+#----------------------------------------------------------------------------#
+
+# Read-only JSON API, versioned under /api/v1. Resources are read as column
+# projections, never as ORM objects:
+#   ?fields=id,name        only return these fields
+#   ?include=location,shows  embed related resources, one extra query per include
+#   ?ids=1,2,3             batch get, in the requested order
+#   ?after=<id>&limit=<n>  keyset pagination on id
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+# the API only reads, replicas can serve all of it
+api.before_request(use_replica)
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+# fields of each resource, by their API name
+FIELDS = {
+    'venues': {
+        'id': Venue.id,
+        'name': Venue.name,
+        'address': Venue.address,
+        'phone': Venue.phone,
+        'image_link': Venue.image_link,
+        'facebook_link': Venue.facebook_link,
+        'website': Venue.venue_website,
+        'seeking_talent': Venue.seeking_talents,
+        'seeking_description': Venue.seeking_description,
+        'location_id': Venue.location_id,
+        'updated_at': Venue.updated_at
+    },
+    'artists': {
+        'id': Artist.id,
+        'name': Artist.name,
+        'phone': Artist.phone,
+        'image_link': Artist.image_link,
+        'facebook_link': Artist.facebook_link,
+        'website': Artist.artist_website,
+        'seeking_venue': Artist.seeking_venues,
+        'seeking_description': Artist.seeking_description,
+        'location_id': Artist.location_id,
+        'updated_at': Artist.updated_at
+    },
+    'shows': {
+        'id': Show.id,
+        'start_time': Show.show_date,
+        'artist_id': Show.artist_id,
+        'venue_id': Show.venue_id,
+        'updated_at': Show.updated_at
+    },
+    'locations': {
+        'id': Location.id,
+        'city': Location.city,
+        'state': Location.state,
+        'updated_at': Location.updated_at
+    }
+}
+
+# related resources that can be included, as
+#   ('one', resource, local key field): the resource whose id is the local key
+#   ('many', resource, remote key field): the resources whose key is the local id
+#   ('genres', association table, association key column)
+INCLUDES = {
+    'venues': {
+        'location': ('one', 'locations', 'location_id'),
+        'shows': ('many', 'shows', 'venue_id'),
+        'genres': ('genres', venues_genres, 'venue_id')
+    },
+    'artists': {
+        'location': ('one', 'locations', 'location_id'),
+        'shows': ('many', 'shows', 'artist_id'),
+        'genres': ('genres', artists_genres, 'artist_id')
+    },
+    'shows': {
+        'venue': ('one', 'venues', 'venue_id'),
+        'artist': ('one', 'artists', 'artist_id')
+    },
+    'locations': {
+        'venues': ('many', 'venues', 'location_id'),
+        'artists': ('many', 'artists', 'location_id')
+    }
+}
+
+
+def parse_list(name):
+    value = request.args.get(name)
+    return [item.strip() for item in value.split(',') if item.strip()] if value else []
+
+
+def parse_ids(values):
+    try:
+        return [int(value) for value in values]
+    except ValueError:
+        abort(400, 'ids must be integers')
+
+
+def serialize(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def fetch(resource, field_names, filter_column=None, values=None, after=None, limit=None):
+    # rows of a resource as dicts, from a single projection query
+    fields = FIELDS[resource]
+    query = db.session.query(*[fields[name].label(name) for name in field_names])
+    if filter_column is not None:
+        query = query.filter(fields[filter_column].in_(values))
+    if after is not None:
+        query = query.filter(fields['id'] > after)
+    query = query.order_by(fields['id'])
+    if limit is not None:
+        query = query.limit(limit)
+    return [{name: serialize(value) for name, value in zip(field_names, row)} for row in query]
+
+
+def include(resource, name, items):
+    # embed a related resource in the items, with one query for all of them
+    kind, target, key = INCLUDES[resource][name]
+    if kind == 'one':
+        ids = {item[key] for item in items if item[key] is not None}
+        related = {row['id']: row for row in fetch(target, list(FIELDS[target]), 'id', ids)} if ids else {}
+        for item in items:
+            item[name] = related.get(item[key])
+    elif kind == 'many':
+        ids = [item['id'] for item in items]
+        related = defaultdict(list)
+        for row in (fetch(target, list(FIELDS[target]), key, ids) if ids else []):
+            related[row[key]].append(row)
+        for item in items:
+            item[name] = related[item['id']]
+    else:
+        ids = [item['id'] for item in items]
+        related = defaultdict(list)
+        if ids:
+            rows = db.session.query(target.c[key], Genre.name).join(Genre, Genre.id == target.c.genre_id).\
+                filter(target.c[key].in_(ids)).order_by(Genre.name)
+            for entity_id, genre in rows:
+                related[entity_id].append(genre)
+        for item in items:
+            item[name] = related[item['id']]
+
+
+def select_fields(resource, includes):
+    # requested fields, plus the keys the includes need, and the ones to hide afterwards
+    requested = parse_list('fields') or list(FIELDS[resource])
+    unknown = [name for name in requested if name not in FIELDS[resource]]
+    if unknown:
+        abort(400, 'unknown fields: ' + ', '.join(unknown))
+    needed = ['id'] + [INCLUDES[resource][name][2] for name in includes
+                       if INCLUDES[resource][name][0] == 'one']
+    extra = [name for name in needed if name not in requested]
+    return requested + list(dict.fromkeys(extra)), set(extra)
+
+
+def list_resource(resource, resource_id=None):
+    includes = parse_list('include')
+    unknown = [name for name in includes if name not in INCLUDES[resource]]
+    if unknown:
+        abort(400, 'unknown includes: ' + ', '.join(unknown))
+    field_names, hidden = select_fields(resource, includes)
+
+    next_url = None
+    if resource_id is not None or request.args.get('ids'):
+        ids = [resource_id] if resource_id is not None else parse_ids(parse_list('ids'))
+        if len(ids) > MAX_LIMIT:
+            abort(400, 'at most {} ids per request'.format(MAX_LIMIT))
+        by_id = {item['id']: item for item in fetch(resource, field_names, 'id', ids)}
+        items = [by_id[item_id] for item_id in ids if item_id in by_id]
+        if resource_id is not None and not items:
+            abort(404, 'no such resource')
+    else:
+        limit = max(1, min(request.args.get('limit', DEFAULT_LIMIT, type=int), MAX_LIMIT))
+        after = request.args.get('after', type=int)
+        items = fetch(resource, field_names, after=after, limit=limit + 1)
+        if len(items) > limit:
+            items = items[:limit]
+            next_url = url_for(request.endpoint, after=items[-1]['id'], limit=limit,
+                               fields=request.args.get('fields'), include=request.args.get('include'))
+
+    for name in includes:
+        include(resource, name, items)
+    for item in items:
+        for name in hidden:
+            del item[name]
+
+    if resource_id is not None:
+        return jsonify(data=items[0])
+    return jsonify(data=items, next=next_url)
+
+
+@api.route('/venues')
+def venues():
+    return list_resource('venues')
+
+
+@api.route('/venues/<int:venue_id>')
+def venue(venue_id):
+    return list_resource('venues', venue_id)
+
+
+@api.route('/artists')
+def artists():
+    return list_resource('artists')
+
+
+@api.route('/artists/<int:artist_id>')
+def artist(artist_id):
+    return list_resource('artists', artist_id)
+
+
+@api.route('/shows')
+def shows():
+    return list_resource('shows')
+
+
+@api.route('/shows/<int:show_id>')
+def show(show_id):
+    return list_resource('shows', show_id)
+
+
+@api.route('/locations')
+def locations():
+    return list_resource('locations')
+
+
+@api.route('/locations/<int:location_id>')
+def location(location_id):
+    return list_resource('locations', location_id)
+
+
+@api.errorhandler(400)
+@api.errorhandler(404)
+@api.errorhandler(HTTPException)
+def api_error(error):
+    # errors are answered in JSON, before the HTML error pages of the app
+    return jsonify(error=error.description, status=error.code), error.code
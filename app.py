@@ -4,18 +4,38 @@
 
 import datetime
 import sys
+from functools import lru_cache
+from itertools import groupby
 import dateutil.parser
 import babel
-from flask import render_template, request, flash, redirect, url_for
+from flask import render_template, stream_template, request, flash, redirect, url_for, abort, g, \
+    get_flashed_messages
 from flask_moment import Moment
 import logging
 from logging import Formatter, FileHandler
 from flask_wtf import Form
 from forms import *
-from models import app, db, Artist, Venue, Show, Location
+from models import app, db, Artist, Venue, Show, Location, Genre, VenueShowStats
 from flask_migrate import Migrate
-from flask_wtf.csrf import CSRFProtect
-import re
+from flask_wtf.csrf import CSRFProtect, generate_csrf
+import search
+import assets
+import async_search
+import templating
+from cache import PageCache
+from compression import Compression
+from instrumentation import Instrumentation
+from conditional import conditional, last_modified
+from api import api
+from locations import resolve_location
+from replicas import read_only
+from importer import import_command
+from exporter import exports, export_command
+from seed import seed_command
+import stats
+import purge
+from sqlalchemy import case, func, select, tuple_
+from sqlalchemy.orm import joinedload, selectinload
 
 # for csrf usage, special thanks to coach Yacine, see https://github.com/yactouat/flask_wtf_demo
 # and https://flask-wtf.readthedocs.io/en/latest/api/#module-flask_wtf.csrf
@@ -24,34 +44,222 @@ csrf.init_app(app)
 
 migrate = Migrate(app, db)
 moment = Moment(app)
+cache = PageCache(app)
+instrumentation = Instrumentation(app)
+compression = Compression(app)
+app.register_blueprint(api)
+app.register_blueprint(exports)
+app.cli.add_command(import_command)
+app.cli.add_command(export_command)
+app.cli.add_command(seed_command)
+app.cli.add_command(stats.stats_command)
+app.cli.add_command(purge.purge_command)
 
 #----------------------------------------------------------------------------#
 # Filters.
 #----------------------------------------------------------------------------#
 
 
+# patterns of the named formats of the datetime filter
+DATETIME_FORMATS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma"
+}
+
+
+@app.before_request
+def select_locale():
+    # locale of the page, the best of LANGUAGES for the Accept-Language header
+    languages = app.config['LANGUAGES']
+    g.locale = request.accept_languages.best_match(languages, default=languages[0])
+
+
+def get_locale():
+    return g.get('locale') or app.config['LANGUAGES'][0]
+
+
+@lru_cache(maxsize=None)
+def datetime_pattern(format, locale):
+    # parsed Babel pattern and locale, built once per (format, locale); Babel's
+    # own named formats ('short', 'long') have no single pattern
+    babel_locale = babel.Locale.parse(locale)
+    if format in ('short', 'long'):
+        return None, babel_locale
+    return babel.dates.parse_pattern(DATETIME_FORMATS.get(format, format)), babel_locale
+
+
+@lru_cache(maxsize=4096)
+def format_datetime_cached(value, format, locale):
+    # pages list the same show dates over and over, each is formatted once
+    pattern, babel_locale = datetime_pattern(format, locale)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=babel.dates.UTC)
+    if pattern is None:
+        return babel.dates.format_datetime(value, format, locale=babel_locale)
+    return pattern.apply(value, babel_locale)
+
+
 def format_datetime(value, format='medium'):
-    date = dateutil.parser.parse(value)
-    if format == 'full':
-        format = "EEEE MMMM, d, y 'at' h:mma"
-    elif format == 'medium':
-        format = "EE MM, dd, y h:mma"
-    return babel.dates.format_datetime(date, format, locale='en')
-
-
-def format_genres(value):
-    # display genres properly
-    # first remove the { and } that surround venue genre
-    value_ = value.replace('{', '')
-    value_ = value_.replace('}', '')
-    # then return an array of genres
-    if re.search(',', value_):
-        return value_.split(',')
-    else:
-        return [value_]
+    # formats datetimes, or the strings of datetimes, in the locale of the request
+    if isinstance(value, str):
+        value = dateutil.parser.parse(value)
+    return format_datetime_cached(value, format, get_locale())
 
 
 app.jinja_env.filters['datetime'] = format_datetime
+app.jinja_env.globals['locale'] = get_locale
+templating.init_app(app)
+assets.init_app(app)
+
+#----------------------------------------------------------------------------#
+# Helpers.
+#----------------------------------------------------------------------------#
+
+
+def set_location(entity, location):
+    # for display purpose, copy the city and state of a venue or artist location
+    entity.city = location.city if location else ''
+    entity.state = location.state if location else ''
+
+
+def split_shows(shows):
+    # split already loaded shows into past and upcoming ones, ordered by date,
+    # without going back to the database
+    now = datetime.now()
+    past_shows = []
+    upcoming_shows = []
+    dated_shows = [show for show in shows if show.show_date is not None]
+    for show in sorted(dated_shows, key=lambda show: show.show_date):
+        show.start_time = show.show_date
+        if show.show_date < now:
+            past_shows.append(show)
+        else:
+            upcoming_shows.append(show)
+    return past_shows, upcoming_shows
+
+
+def get_genres(names):
+    # Genre rows for the given genre names, adding the ones not known yet
+    genres = Genre.query.filter(Genre.name.in_(names)).all() if names else []
+    known_names = {genre.name for genre in genres}
+    for name in names:
+        if name not in known_names:
+            genre = Genre(name=name)
+            db.session.add(genre)
+            genres.append(genre)
+            known_names.add(name)
+    return genres
+
+
+def venue_cache_tags(venue_id):
+    # cache tags of the pages showing a venue: the listings, its own page
+    # and the pages of the artists playing there
+    artist_ids = db.session.query(Show.artist_id).filter(Show.venue_id == venue_id).distinct()
+    return ['venues', 'shows', 'venue:{}'.format(venue_id)] + \
+        ['artist:{}'.format(artist_id) for artist_id, in artist_ids]
+
+
+def artist_cache_tags(artist_id):
+    # cache tags of the pages showing an artist: the listings, its own page
+    # and the pages of the venues it plays at
+    venue_ids = db.session.query(Show.venue_id).filter(Show.artist_id == artist_id).distinct()
+    return ['artists', 'shows', 'artist:{}'.format(artist_id)] + \
+        ['venue:{}'.format(venue_id) for venue_id, in venue_ids]
+
+
+def encode_cursor(show):
+    # keyset pagination cursor of a show row, as "<show date>_<show id>"
+    return '{}_{}'.format(show.show_date.isoformat(), show.id)
+
+
+def decode_cursor(value):
+    # (show date, show id) of a cursor, or None if it is missing or malformed
+    try:
+        show_date, show_id = value.rsplit('_', 1)
+        return datetime.fromisoformat(show_date), int(show_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def stream_page(template_name, **context):
+    # renders the page while it is sent, its rows read as it goes; the session
+    # cookie goes out with the headers, so the flashed messages and the CSRF
+    # token the page uses are settled before
+    get_flashed_messages()
+    generate_csrf()
+    return app.response_class(stream_template(template_name, **context))
+
+
+def stream_shows(rows, per_page, pagination, has_prev):
+    # shows of a page as they are read; the pager is rendered below them, its
+    # cursors are filled in once the page is read
+    last = None
+    for i, row in enumerate(rows):
+        if i == per_page:
+            pagination['next_cursor'] = encode_cursor(last)
+            break
+        if i == 0 and has_prev:
+            pagination['prev_cursor'] = encode_cursor(row)
+        last = row
+        yield dict(row._mapping, start_time=row.show_date)
+
+#----------------------------------------------------------------------------#
+# Freshness.
+#----------------------------------------------------------------------------#
+
+# One aggregate query per read view, giving the last modification of everything
+# the page shows, for conditional GET. Counts are part of the etag so that
+# deletions, which leave no updated_at behind, still change it.
+
+
+def venues_freshness():
+    # the counts of the page come from the show statistics, not from the shows
+    row = db.session.query(*[select(aggregate).scalar_subquery() for aggregate in (
+        func.max(Venue.updated_at), func.count(Venue.id), func.max(Location.updated_at),
+        func.max(VenueShowStats.updated_at), func.count(VenueShowStats.venue_id)
+    )]).one()
+    return last_modified(row[0:1] + row[2:4]), tuple(row)
+
+
+def artists_freshness():
+    row = db.session.query(func.max(Artist.updated_at), func.count(Artist.id)).one()
+    return last_modified(row[0:1]), tuple(row)
+
+
+def shows_freshness():
+    row = db.session.query(*[select(aggregate).scalar_subquery() for aggregate in (
+        func.max(Show.updated_at), func.count(Show.id),
+        func.max(Venue.updated_at), func.max(Artist.updated_at)
+    )]).one()
+    return last_modified(row[0:1] + row[2:4]), tuple(row)
+
+
+def venue_freshness(venue_id):
+    now = datetime.now()
+    row = db.session.query(
+        Venue.updated_at, Location.updated_at, func.max(Show.updated_at),
+        func.max(Artist.updated_at), func.count(Show.id),
+        func.max(case((Show.show_date < now, Show.show_date)))
+    ).outerjoin(Location, Venue.location_id == Location.id).\
+        outerjoin(Show, Show.venue_id == Venue.id).outerjoin(Artist, Show.artist_id == Artist.id).\
+        filter(Venue.id == venue_id).group_by(Venue.id, Venue.updated_at, Location.updated_at).first()
+    if row is None:
+        return None
+    return last_modified(row[0:4], row[5]), tuple(row)
+
+
+def artist_freshness(artist_id):
+    now = datetime.now()
+    row = db.session.query(
+        Artist.updated_at, Location.updated_at, func.max(Show.updated_at),
+        func.max(Venue.updated_at), func.count(Show.id),
+        func.max(case((Show.show_date < now, Show.show_date)))
+    ).outerjoin(Location, Artist.location_id == Location.id).\
+        outerjoin(Show, Show.artist_id == Artist.id).outerjoin(Venue, Show.venue_id == Venue.id).\
+        filter(Artist.id == artist_id).group_by(Artist.id, Artist.updated_at, Location.updated_at).first()
+    if row is None:
+        return None
+    return last_modified(row[0:4], row[5]), tuple(row)
 
 #----------------------------------------------------------------------------#
 # Controllers.
@@ -67,28 +275,57 @@ def index():
 #  ----------------------------------------------------------------
 
 @app.route('/venues')
+@read_only
+@conditional(venues_freshness)
+@cache.cached('venues')
 def venues():
-    # Show venues per location as locations has a venue list
+    # Show venues per location, with their number of upcoming shows
+    # a single query returns one row per venue, ordered by location, with its
+    # count read from the show statistics (see stats.py), then rows are grouped
+    # by area here; locations without venues never show up
+    # ?genre=Jazz only lists the venues of that genre
     form = VenueForm()
-    venues = Location.query.all()
-    for venue_location in venues:
-        venue_location.venues_list = Venue.query.filter_by(
-            location_id=venue_location.id).order_by('id').all()
-
-    return render_template('pages/venues.html', areas=venues, form=form)
+    query = db.session.query(
+        Location.id.label('location_id'), Location.city, Location.state, Venue.id, Venue.name,
+        Venue.updated_at, func.coalesce(VenueShowStats.upcoming_shows_count, 0).label('num_upcoming_shows')
+    ).join(Venue, Venue.location_id == Location.id).\
+        outerjoin(VenueShowStats, VenueShowStats.venue_id == Venue.id)
+    genre = request.args.get('genre')
+    if genre:
+        query = query.filter(Venue.genres.any(Genre.name == genre))
+    rows = query.order_by(Location.id, Venue.id).all()
+
+    areas = []
+    for location_id, area_rows in groupby(rows, key=lambda row: row.location_id):
+        area_rows = list(area_rows)
+        areas.append({
+            "city": area_rows[0].city,
+            "state": area_rows[0].state,
+            # the area block is cached as long as its venues and their counts don't change
+            "cache_key": ('area', area_rows[0].city, area_rows[0].state) + tuple(
+                (row.id, row.updated_at, row.num_upcoming_shows) for row in area_rows),
+            "venues": [{
+                "id": row.id,
+                "name": row.name,
+                "num_upcoming_shows": row.num_upcoming_shows
+            } for row in area_rows]
+        })
+
+    return render_template('pages/venues.html', areas=areas, form=form)
 
 
 @app.route('/venues/search', methods=['POST'])
+@read_only
 def search_venues():
     # search on artists with partial string search. Ensure it is case-insensitive.
     # seach for Hop should return "The Musical Hop".
     # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
     # See https://docs.sqlalchemy.org/en/14/orm/query.html
     # Thanks to https://stackoverflow.com/questions/3325467/
+    # Venues are also matched on their city, state and genres, best matches first
     form = VenueForm()
     search_term = request.form.get('search_term', '')
-    search = "%{}%".format(search_term)
-    venues = Venue.query.filter(Venue.name.ilike(search)).all()
+    venues = search.search_venues(search_term, genre=request.values.get('genre'))
     count = len(venues)
 
     response = {
@@ -99,39 +336,31 @@ def search_venues():
 
 
 @app.route('/venues/<int:venue_id>')
+@read_only
+@conditional(venue_freshness)
+@cache.cached('venue:{venue_id}')
 def show_venue(venue_id):
     # shows the venue page with the given venue_id
-    # real venue data from the venues table, using venue_id
+    # the venue, its location, its shows and their artists are eagerly loaded,
+    # so the page costs the same three queries however many shows the venue has
     form = VenueForm()
-    venue = Venue.query.get(venue_id)
-    venue.city = Location.query.get(venue.location_id).city
-    venue.state = Location.query.get(venue.location_id).state
-
-    now = datetime.now()
-
-    venue.genres_ = format_genres(venue.venue_genres)
-
-    past_shows_query = db.session.query(Show).join(Venue).filter(Show.venue_id == venue_id).\
-        filter(Show.show_date < now).all()
-    past_shows = []
-    for show in past_shows_query:
-        show.artist_name = Artist.query.get(show.artist_id).name
-        show.artist_image_link = Artist.query.get(show.artist_id).image_link
-        show.start_time = show.show_date.isoformat()
-        past_shows.append(show)
-    venue.past_shows = past_shows
-    venue.past_shows_count = len(past_shows)
-
-    upcoming_shows_query = db.session.query(Show).join(Venue).filter(Show.venue_id == venue_id).\
-        filter(Show. show_date > now).all()
-    upcoming_shows = []
-    for show in upcoming_shows_query:
-        show.artist_name = Artist.query.get(show.artist_id).name
-        show.artist_image_link = Artist.query.get(show.artist_id).image_link
-        show.start_time = show.show_date.isoformat()
-        upcoming_shows.append(show)
-    venue.upcoming_shows = upcoming_shows
-    venue.upcoming_shows_count = len(upcoming_shows)
+    venue = Venue.query.options(
+        joinedload(Venue.venue_location),
+        selectinload(Venue.genres),
+        selectinload(Venue.shows).joinedload(Show.artist_shows)
+    ).filter(Venue.id == venue_id).one_or_none()
+    if venue is None:
+        abort(404)
+
+    set_location(venue, venue.venue_location)
+
+    for show in venue.shows:
+        show.artist_name = show.artist_shows.name
+        show.artist_image_link = show.artist_shows.image_link
+        show.artist_updated_at = show.artist_shows.updated_at
+    venue.past_shows, venue.upcoming_shows = split_shows(venue.shows)
+    venue.past_shows_count = len(venue.past_shows)
+    venue.upcoming_shows_count = len(venue.upcoming_shows)
 
     return render_template('pages/show_venue.html', venue=venue, form=form)
 
@@ -152,30 +381,20 @@ def create_venue_submission():
 
     if form.validate_on_submit():
         try:
-            venue_location = Location(
-                city=form.city.data, state=form.state.data)
-
-            # if a location already exists, use it instead
-            existing_venue_location = Location.query.filter(Location.city == form.city.data).\
-                filter(Location.state == form.state.data).first()
-
-            if (existing_venue_location):
-                venue_location_id = existing_venue_location.id
-            else:
-                # else add the new location in the database, then use it for the venue
-                db.session.add(venue_location)
-                db.session.commit()
-                venue_location_id = venue_location.id
+            # find or add the venue location, in the same transaction as the venue
+            venue_location_id = resolve_location(form.city.data, form.state.data)
 
             # insert the new venue to database
             venue = Venue(
                 name=form.name.data, location_id=venue_location_id, address=form.address.data,
-                phone=form.phone.data, image_link=form.image_link.data, venue_genres=form.genres.data,
+                phone=form.phone.data, image_link=form.image_link.data, genres=get_genres(form.genres.data),
                 facebook_link=form.facebook_link.data, venue_website=form.website_link.data,
                 seeking_talents=form.seeking_talent.data, seeking_description=form.seeking_description.data
             )
             db.session.add(venue)
             db.session.commit()
+            search.invalidate('venues')
+            cache.invalidate('venues')
 
             # on successful db insert, flash success
             flash('Venue ' + form.name.data + ' was successfully listed!')
@@ -196,11 +415,13 @@ def create_venue_submission():
 def delete_venue(venue_id):
     # TODO: Complete this endpoint for taking a venue_id, and using
     # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
+    # one batch of bulk statements, without loading the venue nor its shows
     error = False
     try:
-        venue = Venue.query.get(venue_id)
-        db.session.delete(venue)
+        deleted, cache_tags = purge.delete_venues([int(venue_id)])
         db.session.commit()
+        search.invalidate('venues')
+        cache.invalidate(*cache_tags)
     except:
         error = True
         db.session.rollback()
@@ -212,7 +433,8 @@ def delete_venue(venue_id):
 
 # BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
 # clicking that button delete it from the db then redirect the user to the homepage
-@app.route('/venues/<venue_id>/delete', methods=['GET'])
+# The button posts a form with a CSRF token, a GET must not delete anything.
+@app.route('/venues/<venue_id>/delete', methods=['POST'])
 def delete_venue_on_click(venue_id):
     delete_venue(venue_id)
     flash('Venue was successfully deleted!')
@@ -223,24 +445,35 @@ def delete_venue_on_click(venue_id):
 
 
 @app.route('/artists')
+@read_only
+@conditional(artists_freshness)
+@cache.cached('artists')
 def artists():
     # TODO: replace with real data returned from querying the database
+    # ?genre=Jazz only lists the artists of that genre
+    # artists are read from a server-side cursor while the page streams, so
+    # neither the list nor the page is ever held in memory whole
     form = ArtistForm()
-    data = Artist.query.all()
-    return render_template('pages/artists.html', artists=data, form=form)
+    query = select(Artist.id, Artist.name).order_by(Artist.id)
+    genre = request.args.get('genre')
+    if genre:
+        query = query.where(Artist.genres.any(Genre.name == genre))
+    data = db.session.execute(query.execution_options(yield_per=app.config['STREAM_BATCH_SIZE']))
+    return stream_page('pages/artists.html', artists=data, form=form)
 
 
 @app.route('/artists/search', methods=['POST'])
+@read_only
 def search_artists():
     # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
     # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
     # search for "band" should return "The Wild Sax Band".
     # See https://docs.sqlalchemy.org/en/14/orm/query.html
     # Thanks to https://stackoverflow.com/questions/3325467/
+    # Artists are also matched on their city, state and genres, best matches first
     form = ArtistForm()
     search_term = request.form.get('search_term', '')
-    search = "%{}%".format(search_term)
-    artists = Artist.query.filter(Artist.name.ilike(search)).all()
+    artists = search.search_artists(search_term, genre=request.values.get('genre'))
     count = len(artists)
 
     response = {
@@ -251,41 +484,31 @@ def search_artists():
 
 
 @app.route('/artists/<int:artist_id>')
+@read_only
+@conditional(artist_freshness)
+@cache.cached('artist:{artist_id}')
 def show_artist(artist_id):
     # shows the artist page with the given artist_id
-    # retrieve artist data from the artist table, using artist_id
+    # the artist, its location, its shows and their venues are eagerly loaded,
+    # so the page costs the same three queries however many shows the artist has
     form = ArtistForm()
-    artist = Artist.query.get(artist_id)
-    artist.city = Location.query.get(artist.location_id).city
-    artist.state = Location.query.get(artist.location_id).state
-
-    now = datetime.now()
-
-    artist.genres_ = format_genres(artist.artist_genres)
-
-    past_shows_query = db.session.query(Show).join(Artist).filter(Show.artist_id == artist_id).\
-        filter(Show.show_date < now).all()
-    past_shows = []
-    for show in past_shows_query:
-        show.venue_name = Venue.query.get(show.venue_id).name
-        show.venue_image_link = Venue.query.get(show.venue_id).image_link
-        # datetime format accepts only strings and char stream, not datetime
-        # so converting database datetime to string
-        show.start_time = show.show_date.isoformat()
-        past_shows.append(show)
-    artist.past_shows = past_shows
-    artist.past_shows_count = len(past_shows)
-
-    upcoming_shows_query = db.session.query(Show).join(Artist).filter(Show.artist_id == artist_id).\
-        filter(Show. show_date > now).all()
-    upcoming_shows = []
-    for show in upcoming_shows_query:
-        show.venue_name = Venue.query.get(show.venue_id).name
-        show.venue_image_link = Venue.query.get(show.venue_id).image_link
-        show.start_time = show.show_date.isoformat()
-        upcoming_shows.append(show)
-    artist.upcoming_shows = upcoming_shows
-    artist.upcoming_shows_count = len(upcoming_shows)
+    artist = Artist.query.options(
+        joinedload(Artist.artist_location),
+        selectinload(Artist.genres),
+        selectinload(Artist.shows).joinedload(Show.venue_shows)
+    ).filter(Artist.id == artist_id).one_or_none()
+    if artist is None:
+        abort(404)
+
+    set_location(artist, artist.artist_location)
+
+    for show in artist.shows:
+        show.venue_name = show.venue_shows.name
+        show.venue_image_link = show.venue_shows.image_link
+        show.venue_updated_at = show.venue_shows.updated_at
+    artist.past_shows, artist.upcoming_shows = split_shows(artist.shows)
+    artist.past_shows_count = len(artist.past_shows)
+    artist.upcoming_shows_count = len(artist.upcoming_shows)
 
     return render_template('pages/show_artist.html', artist=artist, form=form)
 
@@ -301,7 +524,7 @@ def edit_artist(artist_id):
     artist = {
         "id": artist_id,
         "name": artist.name,
-        "genres": artist.artist_genres,
+        "genres": [genre.name for genre in artist.genres],
         "city": location.city,
         "state": location.state,
         "phone": artist.phone,
@@ -325,34 +548,27 @@ def edit_artist_submission(artist_id):
     if form.validate_on_submit():
         try:
             artist = Artist.query.get(artist_id)
-            # Update artist location
-            # # If the new location exists, use it instead
-            artist_location = Location.query.filter(Location.state == form.state.data).\
-                filter(Location.city == form.city.data).first()
-            if artist_location:
-                artist.location_id = artist_location.id
-            else:
-                # else, add it first to locations, then use it
-                artist_location = Location(
-                    city=form.city.data, state=form.state.data)
-                db.session.add(artist_location)
-                db.session.commit()
-                artist.location_id = artist_location.id
+            # Update artist location, found or added in the same transaction
+            artist.location_id = resolve_location(form.city.data, form.state.data)
 
             artist.name = form.name.data
             artist.phone = form.phone.data
             artist.image_link = form.image_link.data
-            artist.genres = form.genres.data
+            artist.genres = get_genres(form.genres.data)
+            # genres live in another table, make sure the artist is marked as updated
+            artist.updated_at = datetime.utcnow()
             artist.facebook_link = form.facebook_link.data
             artist.artist_website = form.website_link.data
             artist.seeking_venues = form.seeking_venue.data
             artist.seeking_description = form.seeking_description.data
             db.session.commit()
+            search.invalidate('artists')
+            cache.invalidate(*artist_cache_tags(artist_id))
             # on successful db update, flash success
             flash('Artist ' + form.name.data + ' was successfully updated!')
             # for artist display purpose
-            artist.city = Location.query.get(artist.location_id).city
-            artist.state = Location.query.get(artist.location_id).state
+            artist.city = form.city.data
+            artist.state = form.state.data
             return render_template('pages/show_artist.html', artist=artist)
         except:
             db.session.rollback()
@@ -372,7 +588,7 @@ def edit_venue(venue_id):
     venue = {
         "id": venue.id,
         "name": venue.name,
-        "genres": venue.venue_genres,
+        "genres": [genre.name for genre in venue.genres],
         "address": venue.address,
         "city": location.city,
         "state": location.state,
@@ -397,40 +613,32 @@ def edit_venue_submission(venue_id):
     if form.validate_on_submit():
         try:
             venue = Venue.query.get(venue_id)
-            # Update venue location
-            # # If the new location exists, use it instead
-            venue_location = Location.query.filter(Location.state == form.state.data).\
-                filter(Location.city == form.city.data).first()
-            if venue_location:
-                venue.location_id = venue_location.id
-            else:
-                # else, add it first to locations, then use it
-                venue_location = Location(
-                    city=form.city.data, state=form.state.data)
-                db.session.add(venue_location)
-                db.session.commit()
-                venue.location_id = venue_location.id
+            # Update venue location, found or added in the same transaction
+            venue.location_id = resolve_location(form.city.data, form.state.data)
 
             venue.name = form.name.data
             venue.address = form.address.data
             venue.phone = form.phone.data
             venue.image_link = form.image_link.data
-            venue.venue_genres = form.genres.data
+            venue.genres = get_genres(form.genres.data)
+            # genres live in another table, make sure the venue is marked as updated
+            venue.updated_at = datetime.utcnow()
             venue.facebook_link = form.facebook_link.data
             venue.venue_website = form.website_link.data
             venue.seeking_talents = form.seeking_talent.data
             venue.seeking_description = form.seeking_description.data
 
             db.session.commit()
+            search.invalidate('venues')
+            cache.invalidate(*venue_cache_tags(venue_id))
             # on successful db update, flash success
 
             # For venue display purpose on show_venue page
-            venue.genres_=format_genres(venue.genres)
-            venue.city = Location.query.get(venue.location_id).city
-            venue.state = Location.query.get(venue.location_id).state
+            venue.city = form.city.data
+            venue.state = form.state.data
 
             flash('Venue ' + form.name.data + ' was successfully updated!')
-            return render_template('pages/show_venue.html', venue=venue)
+            return render_template('pages/show_venue.html', venue=venue, form=VenueForm())
         except:
             db.session.rollback()
             db.session.close()
@@ -461,30 +669,20 @@ def create_artist_submission():
     if form.validate_on_submit:
 
         try:
-            artist_location = Location(state = form.state.data, city = form.state.data)
-            # If the new location exists, use it instead
-            existing_artist_location = Location.query.filter(Location.state == form.state.data).\
-                filter(Location.city == form.city.data).first()
-            
-            if existing_artist_location:
-                artist_location_id = existing_artist_location.id
-            else:
-                # else, add it first to locations, then use it
-                artist_location = Location(
-                    city=form.city.data, state=form.state.data)
-                db.session.add(artist_location)
-                db.session.commit()
-                artist_location_id = artist_location.id
+            # find or add the artist location, in the same transaction as the artist
+            artist_location_id = resolve_location(form.city.data, form.state.data)
 
             # get this inserted id from database add the venue
             artist = Artist(
                 name=form.name.data, phone=form.phone.data, image_link=form.image_link.data,
-                artist_genres=form.genres.data, facebook_link=form.facebook_link.data,
+                genres=get_genres(form.genres.data), facebook_link=form.facebook_link.data,
                 artist_website=form.website_link.data, seeking_venues=form.seeking_venue.data,
                 seeking_description=form.seeking_description.data, location_id=artist_location_id
             )
             db.session.add(artist)
             db.session.commit()
+            search.invalidate('artists')
+            cache.invalidate('artists')
 
             # on successful db insert, flash success
             flash('Artist ' + form.name.data + ' was successfully listed!')
@@ -507,50 +705,59 @@ def create_artist_submission():
 #  ----------------------------------------------------------------
 
 @app.route('/shows')
+@read_only
+@conditional(shows_freshness)
+@cache.cached('shows')
 def shows():
-    # displays list of shows at /shows
-    # TODO: replace with real venues data.
+    # displays list of shows at /shows, one page at a time
+    # pages are walked with a (show_date, id) keyset cursor, so every page is
+    # a single indexed query joining shows to their venue and artist, streamed
+    # to the client as its rows are read
     form = ShowForm()
-    shows = Show.query.all()
-
-    for show in shows:
-        show.venue_name = Venue.query.get(show.venue_id).name
-        show.artist_name = Artist.query.get(show.artist_id).name
-        show.artist_image_link = Artist.query.get(show.artist_id).image_link
-        show.start_time = show.show_date.isoformat()
+    per_page = app.config['SHOWS_PER_PAGE']
+    after = decode_cursor(request.args.get('after'))
+    before = decode_cursor(request.args.get('before'))
+
+    query = select(
+        Show.id, Show.show_date, Show.updated_at, Show.venue_id, Venue.name.label('venue_name'),
+        Venue.updated_at.label('venue_updated_at'), Show.artist_id, Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link'), Artist.updated_at.label('artist_updated_at')
+    ).join(Venue, Show.venue_id == Venue.id).join(Artist, Show.artist_id == Artist.id).\
+        where(Show.show_date.isnot(None))
+    cursor = tuple_(Show.show_date, Show.id)
+    pagination = {"prev_cursor": None, "next_cursor": None}
+
+    if before:
+        # walk backwards from the cursor, then put the page back in date order
+        rows = db.session.execute(query.where(cursor < tuple_(*before)).
+                                  order_by(Show.show_date.desc(), Show.id.desc()).limit(per_page + 1)).all()
+        has_prev = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        if rows:
+            pagination["next_cursor"] = encode_cursor(rows[-1])
+    else:
+        if after:
+            query = query.where(cursor > tuple_(*after))
+        rows = db.session.execute(query.order_by(Show.show_date, Show.id).limit(per_page + 1).
+                                  execution_options(yield_per=per_page + 1))
+        has_prev = after is not None
 
-    return render_template('pages/shows.html', shows=shows, form=form)
+    shows = stream_shows(rows, per_page, pagination, has_prev)
+    return stream_page('pages/shows.html', shows=shows, pagination=pagination, form=form)
 
 
 @app.route('/shows/search', methods=['POST'])
+@read_only
 def search_shows():
-    # search on artists with partial string search. Ensure it is case-insensitive.
-    # seach for Hop should return "The Musical Hop".
-    # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
-    # See https://docs.sqlalchemy.org/en/14/orm/query.html
-    # Thanks to https://stackoverflow.com/questions/3325467/
+    # search on shows by artist or venue name with partial string search, case-insensitive.
+    # search for "Hop" should return every show at "The Musical Hop".
+    # a show matching on both its artist and its venue is listed once
     form = ShowForm()
     search_term = request.form.get('search_term', '')
-    search = "%{}%".format(search_term)
-    artist_shows = db.session.query(Show).join(Artist).filter(Show.artist_id == Artist.id).\
-        filter(Artist.name.ilike(search)).all()
-    venue_shows = db.session.query(Show).join(Venue).filter(Show.artist_id == Venue.id).\
-        filter(Venue.name.ilike(search)).all()
-
-    shows = []
-
-    for show in artist_shows:
-        show.artist_name = Artist.query.get(show.artist_id).name
-        show.venue_name = Venue.query.get(show.venue_id).name
-        show.start_time = show.show_date.isoformat()
-        shows.append(show)
-    for show in venue_shows:
-        show.artist_name = Artist.query.get(show.artist_id).name
-        show.venue_name = Venue.query.get(show.venue_id).name
-        show.start_time = show.show_date.isoformat()
-        shows.append(show)
-
-    count = len(shows)
+    limit = request.values.get('limit', app.config['SEARCH_RESULTS_LIMIT'], type=int)
+    limit = max(1, min(limit, app.config['SEARCH_RESULTS_LIMIT']))
+    offset = max(0, request.values.get('offset', 0, type=int))
+    count, shows = search.search_shows(search_term, limit=limit, offset=offset)
 
     response = {
         "count": count,
@@ -559,6 +766,26 @@ def search_shows():
     return render_template('pages/search_shows.html', results=response, form=form, search_term=search_term)
 
 
+@app.route('/search')
+@read_only
+async def search_all():
+    # search on venues, artists and shows at once, the three queries running
+    # concurrently on their own connections
+    form = ShowForm()
+    search_term = request.args.get('search_term', '')
+    venues, artists, (shows_count, shows) = await async_search.search_all(
+        search_term, app.config['SEARCH_RESULTS_LIMIT'])
+
+    response = {
+        "count": len(venues) + len(artists) + shows_count,
+        "venues": venues,
+        "artists": artists,
+        "shows_count": shows_count,
+        "shows": shows
+    }
+    return render_template('pages/search_all.html', results=response, form=form, search_term=search_term)
+
+
 @app.route('/shows/create')
 def create_shows():
     # renders form. do not touch.
@@ -576,7 +803,11 @@ def create_show_submission():
             show = Show(artist_id=form.artist_id.data,
                 venue_id=form.venue_id.data, show_date=form.start_time.data)
             db.session.add(show)
+            db.session.flush()
+            stats.add_shows(Show.id == show.id)
             db.session.commit()
+            cache.invalidate('shows', 'venues', 'venue:{}'.format(show.venue_id),
+                             'artist:{}'.format(show.artist_id))
             # on successful db insert, flash success
             flash('Show was successfully listed!')
             return render_template('pages/home.html')
@@ -0,0 +1,213 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import tempfile
+import click
+from flask import current_app, request, send_from_directory, url_for
+from flask.cli import with_appcontext
+
+#----------------------------------------------------------------------------#
+# Static assets.
+#----------------------------------------------------------------------------#
+
+# The stylesheets and scripts of the layout are bundled, minified and written to
+# static/dist under content-hashed names, e.g. dist/main.3f9a1c0b2e.css, with
+# precompressed .gz and .br siblings. static/dist/manifest.json maps each bundle
+# to its current file, and templates link them with {{ asset('main.css') }}.
+# A new build gets new names, so the files are served as immutable for a year.
+#
+# `flask assets` builds them at deploy time; a missing manifest is built on the
+# first call to asset(), and in debug mode bundles are rebuilt when a source
+# changes.
+
+# bundle name: sources under static/, in order
+BUNDLES = {
+    'main.css': ['css/bootstrap.min.css', 'css/layout.main.css', 'css/main.css',
+                 'css/main.responsive.css', 'css/main.quickfix.css'],
+    # modernizr must run before the first paint, the rest is deferred
+    'head.js': ['js/libs/modernizr-2.8.2.min.js'],
+    'main.js': ['js/libs/jquery-1.11.1.min.js', 'js/libs/moment.min.js', 'js/libs/bootstrap-3.1.1.min.js',
+                'js/plugins.js', 'js/script.js'],
+}
+
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+# files being written by a build, renamed into place once complete
+TEMPORARY_PREFIX = '.building-'
+ONE_YEAR = 365 * 24 * 3600
+# encodings of the precompressed siblings, preferred first
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+
+def minify_css(source):
+    # drop comments, except /*! licenses, and the whitespace around punctuation
+    source = re.sub(r'/\*(?!!).*?\*/', '', source, flags=re.S)
+    source = re.sub(r'\s+', ' ', source)
+    source = re.sub(r'\s*([{};,>])\s*', r'\1', source)
+    return source.replace(';}', '}').strip()
+
+
+def minify_js(source):
+    # sources named .min.js are minified already; in the others only whole-line
+    # comments, indentation and blank lines go, leaving the statements untouched
+    lines = (line.strip() for line in source.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//'))
+
+
+def rebase_css_urls(source, path):
+    # relative url() are relative to the source stylesheet, make them absolute
+    directory = posixpath.dirname(path)
+
+    def rebase(match):
+        quote, url = match.groups()
+        if url.startswith(('/', 'data:', 'http:', 'https:', '#')):
+            return match.group(0)
+        target = posixpath.normpath(posixpath.join(directory, url))
+        return 'url({0}{1}{0})'.format(quote, url_for('static', filename=target))
+    return CSS_URL.sub(rebase, source)
+
+
+def bundle(static_folder, name, sources):
+    parts = []
+    for path in sources:
+        with open(os.path.join(static_folder, path), encoding='utf-8') as f:
+            source = f.read()
+        if name.endswith('.css'):
+            parts.append(minify_css(rebase_css_urls(source, path)))
+        else:
+            # drop source map comments, the maps are not published with the bundle
+            source = re.sub(r'^//[#@] sourceMappingURL=.*$', '', source, flags=re.M)
+            parts.append(source if path.endswith('.min.js') else minify_js(source))
+    # a script may not end with a semicolon, the next one would continue it
+    return ('\n' if name.endswith('.css') else ';\n').join(parts).encode('utf-8')
+
+
+def write_file(path, content):
+    # written to a temporary file of the same directory then renamed over the
+    # path: the workers building at once never serve a half-written file
+    descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(path), prefix=TEMPORARY_PREFIX)
+    try:
+        with os.fdopen(descriptor, 'wb') as f:
+            f.write(content)
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, path)
+    except BaseException:
+        os.remove(temporary)
+        raise
+
+
+def compress(path, content):
+    # mtime=0 keeps the file identical from a build to the next
+    write_file(path + '.gz', gzip.compress(content, 9, mtime=0))
+    try:
+        # brotli is optional, without it bundles only get a .gz sibling
+        import brotli
+    except ImportError:
+        return
+    write_file(path + '.br', brotli.compress(content, quality=11))
+
+
+def build(app):
+    # write every bundle and the manifest, removing the files of previous builds
+    directory = os.path.join(app.static_folder, DIST)
+    os.makedirs(directory, exist_ok=True)
+    manifest = {}
+    with app.test_request_context():
+        for name, sources in BUNDLES.items():
+            content = bundle(app.static_folder, name, sources)
+            stem, extension = os.path.splitext(name)
+            filename = '{}.{}{}'.format(stem, hashlib.sha1(content).hexdigest()[:10], extension)
+            path = os.path.join(directory, filename)
+            if not os.path.exists(path):
+                # the compressed copies first, they are served once the bundle exists
+                compress(path, content)
+                write_file(path, content)
+            manifest[name] = filename
+
+    current = set(manifest.values())
+    for filename in os.listdir(directory):
+        base = re.sub(r'\.(gz|br)$', '', filename)
+        # the temporary files of a concurrent build are its own to rename
+        if filename != MANIFEST and base not in current and not filename.startswith(TEMPORARY_PREFIX):
+            os.remove(os.path.join(directory, filename))
+    write_file(os.path.join(directory, MANIFEST), json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    app.extensions['assets'] = manifest
+    return manifest
+
+
+def stale(app):
+    # whether a source changed since the manifest was written
+    manifest_path = os.path.join(app.static_folder, DIST, MANIFEST)
+    if not os.path.exists(manifest_path):
+        return True
+    built = os.path.getmtime(manifest_path)
+    return any(os.path.getmtime(os.path.join(app.static_folder, path)) > built
+               for sources in BUNDLES.values() for path in sources)
+
+
+def load_manifest(app):
+    if app.debug and stale(app):
+        return build(app)
+    manifest = app.extensions.get('assets')
+    if manifest is None:
+        try:
+            with open(os.path.join(app.static_folder, DIST, MANIFEST)) as f:
+                manifest = app.extensions['assets'] = json.load(f)
+        except FileNotFoundError:
+            manifest = build(app)
+    return manifest
+
+
+def asset(name):
+    # url of the current build of a bundle, like url_for('static', filename=...)
+    manifest = load_manifest(current_app)
+    return url_for('static', filename=posixpath.join(DIST, manifest[name]))
+
+
+def send_asset(filename):
+    # built files, precompressed when the client accepts it, cached for a year
+    directory = os.path.join(current_app.static_folder, DIST)
+    mimetype = mimetypes.guess_type(filename)[0]
+    for encoding, suffix in ENCODINGS:
+        if request.accept_encodings[encoding] and os.path.isfile(os.path.join(directory, filename + suffix)):
+            response = send_from_directory(directory, filename + suffix, mimetype=mimetype, max_age=ONE_YEAR)
+            response.content_encoding = encoding
+            break
+    else:
+        response = send_from_directory(directory, filename, mimetype=mimetype, max_age=ONE_YEAR)
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def init_app(app):
+    app.extensions['assets'] = None
+    app.jinja_env.globals['asset'] = asset
+    # more specific than the /static/<path:filename> rule, so it wins for dist/
+    app.add_url_rule(app.static_url_path + '/' + DIST + '/<path:filename>', 'assets', send_asset)
+    app.cli.add_command(assets_command)
+
+
+@click.command('assets')
+@with_appcontext
+def assets_command():
+    """Bundle, minify, fingerprint and compress the static assets."""
+    manifest = build(current_app)
+    directory = os.path.join(current_app.static_folder, DIST)
+    for name, filename in sorted(manifest.items()):
+        sizes = ['{} B'.format(os.path.getsize(os.path.join(directory, filename)))]
+        for encoding, suffix in ENCODINGS:
+            if os.path.exists(os.path.join(directory, filename + suffix)):
+                sizes.append('{} {} B'.format(encoding, os.path.getsize(os.path.join(directory, filename + suffix))))
+        click.echo('{} -> {}/{} ({})'.format(name, DIST, filename, ', '.join(sizes)))
@@ -0,0 +1,68 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import asyncio
+from flask import current_app, g
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+import search
+from models import Venue, Artist
+
+#----------------------------------------------------------------------------#
+# Async search.
+#----------------------------------------------------------------------------#
+
+# Searching venues, artists and shows at once runs the three searches concurrently,
+# each on its own connection, through asyncio drivers (asyncpg, aiosqlite). Async
+# views run in a fresh event loop per request and connections can't outlive their
+# loop, so the engines don't pool them (NullPool).
+
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite'
+}
+
+# async engines by bind, None being the primary
+engines = {}
+
+
+def get_engine():
+    # engine of the replica picked for the request, or of the primary
+    bind = g.get('replica')
+    if bind not in engines:
+        config = current_app.config
+        url = make_url(config['SQLALCHEMY_BINDS'][bind] if bind else config['SQLALCHEMY_DATABASE_URI'])
+        engines[bind] = create_async_engine(
+            url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()]), poolclass=NullPool)
+    return engines[bind]
+
+
+async def search_entities(engine, model, location_relationship, term, limit):
+    # (id, name) of the best `limit` matching venues or artists, best matches first
+    columns = [model.id, model.name]
+    async with AsyncSession(engine) as session:
+        if engine.dialect.name == 'postgresql':
+            statement = search.entities_statement(model, location_relationship, term, columns=columns)
+            return (await session.execute(statement.limit(limit))).all()
+        ids = await session.run_sync(search.indexed_ids, model, location_relationship, term)
+        ids = ids[:limit]
+        rows = await session.execute(search.indexed_statement(model, ids, columns=columns))
+        return search.in_index_order(ids, rows)
+
+
+async def search_shows(engine, term, limit):
+    async with AsyncSession(engine) as session:
+        return search.show_results((await session.execute(search.shows_statement(term, limit))).all())
+
+
+async def search_all(term, limit):
+    # at most `limit` venues, artists and shows, with the count of all the
+    # matching shows, queried concurrently
+    engine = get_engine()
+    return await asyncio.gather(
+        search_entities(engine, Venue, Venue.venue_location, term, limit),
+        search_entities(engine, Artist, Artist.artist_location, term, limit),
+        search_shows(engine, term, limit)
+    )
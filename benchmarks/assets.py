@@ -0,0 +1,102 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import argparse
+import os
+import re
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#----------------------------------------------------------------------------#
+# Static assets benchmark.
+#----------------------------------------------------------------------------#
+
+# Requests and bytes of the stylesheets and scripts of the home page, through the
+# Flask test client, for the built bundles and for their sources served one by
+# one from /static as the layout used to link them. Requests blocking the first
+# paint are the stylesheets and the scripts of <head> without defer or async.
+# External scripts (the Font Awesome kit) are the same in both and not counted.
+#   python benchmarks/assets.py
+
+COMMENT = re.compile(r'<!--.*?-->', re.S)
+HEAD = re.compile(r'<head>(.*?)</head>', re.S)
+TAG = re.compile(r'<(link|script)\b([^>]*)>')
+URL = re.compile(r'(?:href|src)="(/static/[^"]+)"')
+
+CLIENTS = [('identity', ''), ('gzip', 'gzip'), ('gzip, br', 'gzip, br')]
+
+
+def page_assets(html):
+    # (url, blocks the first paint) of the local stylesheets and scripts of a page,
+    # leaving out the ones of IE conditional comments
+    html = COMMENT.sub('', html)
+    head = HEAD.search(html).group(1)
+    found = []
+    for kind, attributes in TAG.findall(html):
+        url = URL.search(attributes)
+        if not url or (kind == 'link' and 'stylesheet' not in attributes):
+            continue
+        blocking = (kind == 'link' or ('defer' not in attributes and 'async' not in attributes)) \
+            and '<{}{}>'.format(kind, attributes) in head
+        found.append((url.group(1), blocking))
+    return found
+
+
+def transfer(client, urls, accept_encoding):
+    total = 0
+    for url in urls:
+        response = client.get(url, headers={'Accept-Encoding': accept_encoding})
+        assert response.status_code == 200, (url, response.status_code)
+        total += len(response.get_data())
+    return total
+
+
+def report(label, client, assets):
+    blocking = [url for url, blocks in assets if blocks]
+    urls = [url for url, blocks in assets]
+    line = '{:<10} {:>8} {:>8}'.format(label, len(urls), len(blocking))
+    for name, accept_encoding in CLIENTS:
+        line += ' {:>10} {:>10}'.format(transfer(client, urls, accept_encoding),
+                                        transfer(client, blocking, accept_encoding))
+    print(line)
+
+
+def main():
+    argparse.ArgumentParser().parse_args()
+
+    database = tempfile.NamedTemporaryFile(suffix='.db', delete=False).name
+    os.environ.update(DATABASE_URL='sqlite:///' + database, CACHE_TYPE='null')
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+
+    from app import app
+    from assets import BUNDLES, DIST, build
+    from models import db
+
+    try:
+        with app.app_context():
+            db.create_all()
+        manifest = build(app)
+        client = app.test_client()
+        bundled = page_assets(client.get('/').get_data(as_text=True))
+
+        # each bundle replaced by its sources, as linked before the build step
+        sources_of = {'/static/{}/{}'.format(DIST, filename): BUNDLES[name] for name, filename in manifest.items()}
+        unbundled = [('/static/' + source, blocks) for url, blocks in bundled for source in sources_of[url]]
+
+        header = '{:<10} {:>8} {:>8}'.format('assets', 'requests', 'blocking')
+        for name, accept_encoding in CLIENTS:
+            header += ' {:>10} {:>10}'.format(name + ' B', 'blocking B')
+        print(header)
+        report('sources', client, unbundled)
+        report('bundles', client, bundled)
+    finally:
+        os.remove(database)
+
+
+if __name__ == '__main__':
+    main()
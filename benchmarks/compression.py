@@ -0,0 +1,82 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#----------------------------------------------------------------------------#
+# Compression benchmark.
+#----------------------------------------------------------------------------#
+
+# CPU time against bytes saved when compressing the real pages of the app, on a
+# throwaway SQLite database filled by `flask seed` at the given scale (see
+# tests/test_routes.py). Each page is fetched uncompressed, then compressed with
+# gzip and brotli at several levels; the levels in use (COMPRESS_LEVELS) are
+# marked with a *.
+#   python benchmarks/compression.py --scale 5
+
+PAGES = ['/', '/venues', '/venues/1', '/artists', '/artists/1', '/shows', '/api/v1/shows?include=venue,artist',
+         '/export/shows.csv']
+LEVELS = [('gzip', 1), ('gzip', 6), ('gzip', 9), ('br', 1), ('br', 5), ('br', 11)]
+BASE_SIZES = {'locations': 10, 'venues': 50, 'artists': 100, 'shows': 1000}
+
+
+def cpu_ms(function, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.process_time()
+        function()
+        times.append(time.process_time() - started)
+    times.sort()
+    return times[len(times) // 2] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scale', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=7)
+    args = parser.parse_args()
+
+    database = tempfile.NamedTemporaryFile(suffix='.db', delete=False).name
+    os.environ.update(DATABASE_URL='sqlite:///' + database, CACHE_TYPE='null', COMPRESS='false')
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+
+    from app import app
+    from compression import brotli, compress
+    from models import db
+    from seed import generate
+
+    levels = [(encoding, level) for encoding, level in LEVELS if encoding == 'gzip' or brotli is not None]
+    try:
+        with app.app_context():
+            db.create_all()
+            generate(seed=args.scale, **{name: size * args.scale for name, size in BASE_SIZES.items()})
+        client = app.test_client()
+
+        print('{:<36} {:>9}'.format('page', 'bytes') + ''.join(
+            ' {:>17}'.format('{} {}'.format(encoding, level)) for encoding, level in levels))
+        for url in PAGES:
+            response = client.get(url)
+            body = response.get_data()
+            configured = app.config['COMPRESS_LEVELS'].get(response.mimetype, {})
+            line = '{:<36} {:>9}'.format(url[:36], len(body))
+            for encoding, level in levels:
+                size = len(compress(body, encoding, level))
+                ms = cpu_ms(lambda: compress(body, encoding, level), args.repeat)
+                mark = '*' if configured.get(encoding) == level else ' '
+                line += ' {:>7} {:>7.2f}ms{}'.format(size, ms, mark)
+            print(line)
+    finally:
+        os.remove(database)
+
+
+if __name__ == '__main__':
+    main()
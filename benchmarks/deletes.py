@@ -0,0 +1,124 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#----------------------------------------------------------------------------#
+# Delete benchmark.
+#----------------------------------------------------------------------------#
+
+# Time and statements taken to delete a venue, and an artist, with thousands of
+# shows, on a throwaway SQLite database filled by `flask seed` plus the shows of
+# the deleted one. `orm` loads the entity and every show in the session and
+# deletes them one by one, as db.session.delete() would with a delete cascade on
+# the relationship; `bulk` is purge.delete_entities(), used by delete_venue and
+# `flask purge`. An executemany counts as one statement per row. Each run starts
+# from the same fresh data.
+#   python benchmarks/deletes.py --shows 1000 5000 20000
+
+BASE_SIZES = {'locations': 10, 'venues': 50, 'artists': 100, 'shows': 1000}
+SHOW_DATES = datetime(2020, 1, 1)
+
+
+def orm_delete(entity, model, entity_id):
+    from models import db
+    from purge import ENTITIES
+    import stats
+    show_key, stats_key = ENTITIES[entity][1], ENTITIES[entity][4]
+    stats.remove_shows(show_key == entity_id)
+    instance = db.session.get(model, entity_id)
+    for show in instance.shows:
+        db.session.delete(show)
+    instance.genres = []
+    db.session.execute(stats_key.table.delete().where(stats_key == entity_id))
+    db.session.delete(instance)
+
+
+def bulk_delete(entity, model, entity_id):
+    from purge import delete_entities
+    delete_entities(entity, [entity_id])
+
+
+def fill(app, shows, entity):
+    # a fresh catalog, then `shows` shows for venue 1 or artist 1 spread over the
+    # other side, half of them past
+    from sqlalchemy import insert
+    from models import db, Show
+    from seed import generate
+    import stats
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        generate(seed=1, **BASE_SIZES)
+        other = 'artist_id' if entity == 'venues' else 'venue_id'
+        key = 'venue_id' if entity == 'venues' else 'artist_id'
+        others = BASE_SIZES['artists' if entity == 'venues' else 'venues']
+        db.session.execute(insert(Show), [
+            {key: 1, other: 1 + i % others, 'show_date': SHOW_DATES + timedelta(days=i - shows // 2)}
+            for i in range(shows)])
+        stats.refresh()
+        db.session.commit()
+
+
+def run(app, entity, method, shows):
+    from sqlalchemy import event, func, select
+    from models import db, Venue, Artist, Show
+    fill(app, shows, entity)
+    model = Venue if entity == 'venues' else Artist
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        # an executemany runs the statement once per parameter set
+        statements.append(len(parameters) if executemany else 1)
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            started = time.perf_counter()
+            method(entity, model, 1)
+            db.session.commit()
+            elapsed = time.perf_counter() - started
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+        key = Show.venue_id if entity == 'venues' else Show.artist_id
+        left = db.session.execute(select(func.count(Show.id)).where(key == 1)).scalar()
+        assert left == 0 and db.session.get(model, 1) is None, (entity, method.__name__)
+    return elapsed * 1000, sum(statements)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--shows', type=int, nargs='+', default=[1000, 5000, 20000])
+    args = parser.parse_args()
+
+    database = tempfile.NamedTemporaryFile(suffix='.db', delete=False).name
+    os.environ.update(DATABASE_URL='sqlite:///' + database, CACHE_TYPE='null')
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+
+    from app import app
+
+    try:
+        print('{:<8} {:>7} {:>12} {:>11} {:>12} {:>11}'.format(
+            'entity', 'shows', 'orm ms', 'orm stmts', 'bulk ms', 'bulk stmts'))
+        for entity in ('venues', 'artists'):
+            for shows in args.shows:
+                orm_ms, orm_statements = run(app, entity, orm_delete, shows)
+                bulk_ms, bulk_statements = run(app, entity, bulk_delete, shows)
+                print('{:<8} {:>7} {:>12.1f} {:>11} {:>12.1f} {:>11}'.format(
+                    entity, shows, orm_ms, orm_statements, bulk_ms, bulk_statements))
+    finally:
+        os.remove(database)
+
+
+if __name__ == '__main__':
+    main()
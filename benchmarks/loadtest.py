@@ -0,0 +1,107 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import argparse
+import http.client
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+#----------------------------------------------------------------------------#
+# Load test.
+#----------------------------------------------------------------------------#
+
+# Starts gunicorn with gunicorn.conf.py for each worker count, hammers a few read
+# pages with concurrent keep-alive clients and prints the throughput and latency
+# of each run. Point DATABASE_URL at a seeded postgres database, or a SQLite file
+# as a stand-in, e.g.
+#   DATABASE_URL=sqlite:////tmp/fyyur.db python benchmarks/loadtest.py --workers 1 2 4
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PATHS = ['/venues', '/artists', '/shows', '/venues/1', '/artists/1', '/api/v1/shows?limit=100']
+
+
+def wait_until_up(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/')
+            connection.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('gunicorn did not start')
+
+
+def client(port, paths, stop_at, latencies, errors):
+    # one keep-alive connection requesting the paths in turn until stop_at
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    count = 0
+    while time.monotonic() < stop_at:
+        path = paths[count % len(paths)]
+        count += 1
+        started = time.monotonic()
+        try:
+            connection.request('GET', path)
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException) as error:
+            errors.append(type(error).__name__)
+            connection.close()
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            continue
+        latencies.append(time.monotonic() - started)
+    connection.close()
+
+
+def run(workers, threads, clients, duration, port, paths):
+    environ = dict(os.environ, WEB_CONCURRENCY=str(workers), PORT=str(port))
+    environ.setdefault('SECRET_KEY', 'benchmark')
+    if threads:
+        environ['GUNICORN_THREADS'] = str(threads)
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--access-logfile', '/dev/null'],
+        cwd=ROOT, env=environ, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_up(port)
+        latencies = []
+        errors = []
+        stop_at = time.monotonic() + duration
+        with ThreadPoolExecutor(clients) as executor:
+            for _ in range(clients):
+                executor.submit(client, port, paths, stop_at, latencies, errors)
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies.sort()
+    percentile = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0
+    print('{:>7} {:>7} {:>9.1f} {:>8.1f} {:>8.1f} {:>8.1f} {:>6}'.format(
+        workers, threads or '-', len(latencies) / duration,
+        percentile(0.5), percentile(0.95), percentile(0.99), len(errors)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--threads', type=int, default=None, help='threads per worker, DB_POOL_SIZE by default')
+    parser.add_argument('--clients', type=int, default=16, help='concurrent client connections')
+    parser.add_argument('--duration', type=float, default=10, help='seconds per run')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--path', dest='paths', action='append', help='paths to request, repeatable')
+    args = parser.parse_args()
+
+    print('{:>7} {:>7} {:>9} {:>8} {:>8} {:>8} {:>6}'.format(
+        'workers', 'threads', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'errors'))
+    for workers in args.workers:
+        run(workers, args.threads, args.clients, args.duration, args.port, args.paths or PATHS)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#----------------------------------------------------------------------------#
+# Render benchmark.
+#----------------------------------------------------------------------------#
+
+# Render time of the pages listing shows, with and without the {% cache %}
+# fragments, from the template signals: the Server-Timing header cannot tell it
+# for streamed pages such as /shows, which render after their headers. Runs on a
+# throwaway SQLite database where, for each size, a new venue and five artists
+# hold all the shows, with the page cache off:
+#   python benchmarks/render.py --shows 100 500 2000
+
+def render_times(client, url, repeat):
+    from flask import before_render_template, template_rendered
+    times = []
+    started = []
+
+    def before_render(app, template, context):
+        started.append(time.perf_counter())
+
+    def rendered(app, template, context):
+        times.append((time.perf_counter() - started.pop()) * 1000)
+
+    with before_render_template.connected_to(before_render), template_rendered.connected_to(rendered):
+        for _ in range(repeat):
+            client.get(url).get_data()
+    times.sort()
+    return times[len(times) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--shows', type=int, nargs='+', default=[100, 500, 2000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    database = tempfile.NamedTemporaryFile(suffix='.db', delete=False).name
+    os.environ.update(DATABASE_URL='sqlite:///' + database, CACHE_TYPE='null')
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+
+    from sqlalchemy import func, select
+    from app import app
+    from models import db, Venue, Artist
+    from seed import generate
+
+    client = app.test_client()
+    print('{:>6} {:<12} {:>10} {:>10} {:>8}'.format('shows', 'page', 'plain ms', 'cached ms', 'speedup'))
+    try:
+        with app.app_context():
+            db.create_all()
+        for shows in args.shows:
+            # a new venue and new artists holding the given number of shows
+            with app.app_context():
+                generate(locations=1, venues=1, artists=5, shows=shows, seed=shows)
+                venue_id = db.session.execute(select(func.max(Venue.id))).scalar()
+                # the first of the new artists, which gets most of their shows
+                artist_id = db.session.execute(select(func.max(Artist.id))).scalar() - 4
+            pages = (('venue', '/venues/{}'.format(venue_id)), ('artist', '/artists/{}'.format(artist_id)),
+                     ('shows', '/shows'))
+            for page, url in pages:
+                app.config['FRAGMENT_CACHE'] = False
+                plain = render_times(client, url, args.repeat)
+                app.config['FRAGMENT_CACHE'] = True
+                client.get(url)
+                cached = render_times(client, url, args.repeat)
+                print('{:>6} {:<12} {:>10.2f} {:>10.2f} {:>7.1f}x'.format(
+                    shows, page, plain, cached, plain / cached if cached else 0))
+    finally:
+        os.remove(database)
+
+
+if __name__ == '__main__':
+    main()
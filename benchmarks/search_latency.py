@@ -0,0 +1,63 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from models import db
+import async_search
+import search
+
+#----------------------------------------------------------------------------#
+# Search latency.
+#----------------------------------------------------------------------------#
+
+# Compares searching venues, artists and shows one after the other on the sync
+# session with the concurrent async search of /search, in process, against the
+# database of DATABASE_URL, e.g.
+#   DATABASE_URL=postgresql://fyyur@localhost/fyyur python benchmarks/search_latency.py --term music
+
+
+def sync_search(term, limit):
+    return (search.search_venues(term), search.search_artists(term), search.search_shows(term, limit))
+
+
+def measure(label, run, iterations):
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        run()
+        latencies.append(time.perf_counter() - started)
+        db.session.remove()
+    latencies.sort()
+    percentile = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+    print('{:<6} {:>8.2f} {:>8.2f} {:>8.2f}'.format(label, percentile(0.5), percentile(0.99), max(latencies) * 1000))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--term', default='a')
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+    limit = app.config['SEARCH_RESULTS_LIMIT']
+
+    with app.test_request_context('/search'):
+        # warm up both paths, e.g. the fallback trigram indexes on SQLite
+        sync_search(args.term, limit)
+        asyncio.run(async_search.search_all(args.term, limit))
+
+        print('{:<6} {:>8} {:>8} {:>8}'.format('path', 'p50 ms', 'p99 ms', 'max ms'))
+        measure('sync', lambda: sync_search(args.term, limit), args.iterations)
+        # like the view, every search runs in a new event loop
+        measure('async', lambda: asyncio.run(async_search.search_all(args.term, limit)), args.iterations)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request, session, jsonify, g
+from flask_wtf.csrf import generate_csrf
+
+#----------------------------------------------------------------------------#
+# Cache backends.
+#----------------------------------------------------------------------------#
+
+# Both backends store values with a TTL, and keep integer tag versions used to
+# invalidate every page rendered from some data at once: a page key embeds the
+# current version of each of its tags, so bumping a tag orphans the old entries.
+
+
+class LRUBackend:
+    # In-process backend, bounded to max_entries, least recently used first out
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.versions = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def get_versions(self, tags):
+        with self.lock:
+            return [self.versions.get(tag, 0) for tag in tags]
+
+    def incr(self, tag):
+        with self.lock:
+            self.versions[tag] = self.versions.get(tag, 0) + 1
+
+    def size(self):
+        return len(self.entries)
+
+
+class RedisBackend:
+    # Backend shared by all workers, on a local Redis-compatible server
+
+    def __init__(self, url, prefix='fyyur:'):
+        # redis is only needed when this backend is configured
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return pickle.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl):
+        self.client.setex(self.prefix + key, ttl, pickle.dumps(value))
+
+    def get_versions(self, tags):
+        if not tags:
+            return []
+        values = self.client.mget([self.prefix + 'tag:' + tag for tag in tags])
+        return [int(value) if value is not None else 0 for value in values]
+
+    def incr(self, tag):
+        self.client.incr(self.prefix + 'tag:' + tag)
+
+    def size(self):
+        return self.client.dbsize()
+
+#----------------------------------------------------------------------------#
+# Page cache.
+#----------------------------------------------------------------------------#
+
+# placeholder stored instead of the CSRF token of the request that filled the cache
+CSRF_PLACEHOLDER = '__csrf_token__'
+
+
+class PageCache:
+    # Caches rendered GET pages, invalidated by tags from the write controllers
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        cache_type = app.config.get('CACHE_TYPE', 'lru')
+        self.default_ttl = app.config.get('CACHE_DEFAULT_TTL', 60)
+        if cache_type == 'redis':
+            self.backend = RedisBackend(app.config['CACHE_REDIS_URL'])
+        elif cache_type == 'lru':
+            self.backend = LRUBackend(app.config.get('CACHE_MAX_ENTRIES', 1024))
+        app.extensions['page_cache'] = self
+        app.add_url_rule('/cache/stats', 'cache_stats', self.stats_view)
+
+    def key(self, name, tags):
+        versions = self.backend.get_versions(tags)
+        return '{}|{}'.format(name, ','.join(
+            '{}={}'.format(tag, version) for tag, version in zip(tags, versions)))
+
+    def get(self, key):
+        if self.backend is None:
+            return None
+        value = self.backend.get(key)
+        self.stats['hits' if value is not None else 'misses'] += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        if self.backend is not None:
+            self.backend.set(key, value, ttl or self.default_ttl)
+
+    def invalidate(self, *tags):
+        # orphan every entry cached under one of these tags
+        if self.backend is None:
+            return
+        for tag in tags:
+            self.backend.incr(tag)
+        self.stats['invalidations'] += len(tags)
+
+    def cached(self, *tags, ttl=None):
+        # cache the page of a GET view under the given tags, which may use the
+        # view arguments, e.g. @cache.cached('venues', 'venue:{venue_id}')
+        def decorator(view):
+            @wraps(view)
+            def wrapper(**kwargs):
+                # flashed messages are shown once, pages showing them are not cached
+                if self.backend is None or '_flashes' in session:
+                    return view(**kwargs)
+                page_tags = [tag.format(**kwargs) for tag in tags]
+                # pages are rendered in the locale of the request; under
+                # conditional() the key holds the ETag of the data as well, so a
+                # worker that missed an invalidation (in-process LRU backend)
+                # can't serve an older page under the ETag of newer data
+                name = 'page:{}:{}:{}'.format(g.get('locale'), g.get('etag'), request.full_path)
+                # tag versions are read before the view runs: a page rendered
+                # while its data is invalidated is stored under the old versions
+                key = self.key(name, page_tags)
+                page = self.get(key)
+                if page is not None:
+                    body, status, mimetype = page
+                    response = current_app.response_class(
+                        body.replace(CSRF_PLACEHOLDER, generate_csrf()),
+                        status=status, mimetype=mimetype)
+                    response.headers['X-Cache'] = 'HIT'
+                    response.vary.add('Accept-Language')
+                    return response
+
+                response = current_app.make_response(view(**kwargs))
+                if response.status_code == 200 and response.is_streamed:
+                    response.response = self.tee(response.response, key, response.mimetype, ttl)
+                elif response.status_code == 200:
+                    body = response.get_data(as_text=True).replace(generate_csrf(), CSRF_PLACEHOLDER)
+                    self.set(key, (body, response.status_code, response.mimetype), ttl)
+                response.headers['X-Cache'] = 'MISS'
+                response.vary.add('Accept-Language')
+                return response
+            return wrapper
+        return decorator
+
+    def tee(self, chunks, key, mimetype, ttl):
+        # streams the page and keeps a copy of it, cached once the whole page was
+        # sent; the request context may be gone by then, the token is read before
+        token = generate_csrf()
+
+        def stream():
+            parts = []
+            for chunk in chunks:
+                parts.append(chunk if isinstance(chunk, str) else chunk.decode('utf-8'))
+                yield chunk
+            body = ''.join(parts).replace(token, CSRF_PLACEHOLDER)
+            self.set(key, (body, 200, mimetype), ttl)
+        return stream()
+
+    def stats_view(self):
+        lookups = self.stats['hits'] + self.stats['misses']
+        return jsonify(
+            backend=type(self.backend).__name__ if self.backend else None,
+            size=self.backend.size() if self.backend else 0,
+            hit_ratio=self.stats['hits'] / lookups if lookups else None,
+            **self.stats
+        )
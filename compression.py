@@ -0,0 +1,200 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import zlib
+from collections import deque
+from werkzeug.datastructures import Headers
+from werkzeug.http import parse_accept_header, parse_options_header
+from werkzeug.wsgi import ClosingIterator
+
+try:
+    # brotli is optional, without it responses are only gzipped
+    import brotli
+except ImportError:
+    brotli = None
+
+#----------------------------------------------------------------------------#
+# Response compression.
+#----------------------------------------------------------------------------#
+
+# WSGI middleware compressing responses with brotli or gzip, whichever the client
+# prefers in Accept-Encoding (brotli on a tie). Only the types listed in
+# COMPRESS_LEVELS are compressed, each at its own level, and only bodies of at
+# least COMPRESS_MIN_SIZE bytes. Responses already encoded, such as the
+# precompressed files of static/dist, partial responses and `no-transform` ones
+# pass through untouched.
+#
+# A response with a Content-Length is compressed in one go and keeps one. A
+# streamed response is compressed as it goes: its first bytes are sent as soon
+# as they are known to reach COMPRESS_MIN_SIZE, then the encoder is flushed each
+# time STREAM_FLUSH_SIZE bytes of the page are pending, so that pages stream
+# without sending a compressed block for every small chunk.
+#
+# Data a legacy application passes to the write() callable of start_response
+# before returning goes into the same stream, ahead of its iterable.
+
+STREAM_FLUSH_SIZE = 4096
+
+
+class GzipEncoder:
+
+    def __init__(self, level):
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def flush(self):
+        return self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliEncoder:
+
+    def __init__(self, level):
+        self.compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self.compressor.process(data)
+
+    def flush(self):
+        return self.compressor.flush()
+
+    def finish(self):
+        return self.compressor.finish()
+
+
+ENCODERS = {'br': BrotliEncoder, 'gzip': GzipEncoder}
+
+
+def compress(data, encoding, level):
+    encoder = ENCODERS[encoding](level)
+    return encoder.compress(data) + encoder.finish()
+
+
+def negotiate(accept_encoding):
+    # encoding preferred by the client among the available ones, or None
+    accepted = parse_accept_header(accept_encoding)
+    available = ['br', 'gzip'] if brotli is not None else ['gzip']
+    encoding = max(available, key=lambda encoding: (accepted[encoding], encoding == 'br'))
+    return encoding if accepted[encoding] > 0 else None
+
+
+def with_written(written, app_iter):
+    # the body of an application using write(): what it wrote, then its iterable
+    while written:
+        yield written.popleft()
+    for chunk in app_iter:
+        while written:
+            yield written.popleft()
+        yield chunk
+    while written:
+        yield written.popleft()
+
+
+class Compression:
+    # gzip/brotli compression of the responses of the app
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.config = app.config
+        self.wsgi_app = app.wsgi_app
+        app.wsgi_app = self
+        app.extensions['compression'] = self
+
+    def levels(self, status, headers):
+        # compression levels of the response per encoding, or None when it is
+        # not to be compressed
+        code = int(status.split(' ', 1)[0])
+        if code < 200 or code in (204, 206, 304) or 'Content-Encoding' in headers \
+                or 'Content-Range' in headers or 'no-transform' in headers.get('Cache-Control', ''):
+            return None
+        mimetype = parse_options_header(headers.get('Content-Type', ''))[0]
+        return self.config['COMPRESS_LEVELS'].get(mimetype)
+
+    def __call__(self, environ, start_response):
+        if not self.config.get('COMPRESS', True) or environ['REQUEST_METHOD'] == 'HEAD':
+            return self.wsgi_app(environ, start_response)
+
+        response = []
+        written = deque()
+
+        def capture(status, headers, exc_info=None):
+            # the response is started once its encoding is known, data written
+            # until then is kept for the body
+            response[:] = [status, Headers(headers), exc_info]
+            return written.append
+
+        app_iter = self.wsgi_app(environ, capture)
+        status, headers, exc_info = response
+        if written:
+            app_iter = ClosingIterator(with_written(written, app_iter), getattr(app_iter, 'close', None))
+        levels = self.levels(status, headers)
+        if levels is None:
+            start_response(status, headers.to_wsgi_list(), exc_info)
+            return app_iter
+
+        # a compressible type varies with Accept-Encoding, compressed or not
+        vary = headers.get('Vary')
+        if not vary:
+            headers['Vary'] = 'Accept-Encoding'
+        elif 'accept-encoding' not in vary.lower():
+            headers['Vary'] = vary + ', Accept-Encoding'
+        encoding = negotiate(environ.get('HTTP_ACCEPT_ENCODING'))
+        length = headers.get('Content-Length', type=int)
+        if encoding is None or (length is not None and length < self.config['COMPRESS_MIN_SIZE']):
+            start_response(status, headers.to_wsgi_list(), exc_info)
+            return app_iter
+        body = self.encoded(app_iter, status, headers, exc_info, start_response, encoding, levels[encoding], length)
+        # closes the response of the app even when the body is never read
+        return ClosingIterator(body, getattr(app_iter, 'close', None))
+
+    def encoded(self, app_iter, status, headers, exc_info, start_response, encoding, level, length):
+        chunks = iter(app_iter)
+        head = []
+        if length is None:
+            # read the stream up to the minimum size, small bodies are sent as they are
+            size = 0
+            for chunk in chunks:
+                head.append(chunk)
+                size += len(chunk)
+                if size >= self.config['COMPRESS_MIN_SIZE']:
+                    break
+            else:
+                headers['Content-Length'] = str(size)
+                start_response(status, headers.to_wsgi_list(), exc_info)
+                yield b''.join(head)
+                return
+
+        headers['Content-Encoding'] = encoding
+        # the compressed body is another representation of the same content
+        etag = headers.get('ETag')
+        if etag and not etag.startswith('W/'):
+            headers['ETag'] = 'W/' + etag
+        encoder = ENCODERS[encoding](level)
+
+        if length is not None:
+            body = encoder.compress(b''.join(head) + b''.join(chunks)) + encoder.finish()
+            headers['Content-Length'] = str(len(body))
+            start_response(status, headers.to_wsgi_list(), exc_info)
+            yield body
+            return
+
+        start_response(status, headers.to_wsgi_list(), exc_info)
+        yield encoder.compress(b''.join(head)) + encoder.flush()
+        pending = 0
+        for chunk in chunks:
+            data = encoder.compress(chunk)
+            pending += len(chunk)
+            if pending >= STREAM_FLUSH_SIZE:
+                data += encoder.flush()
+                pending = 0
+            if data:
+                yield data
+        yield encoder.finish()
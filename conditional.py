@@ -0,0 +1,81 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import hashlib
+import time
+from datetime import timezone
+from functools import wraps
+from flask import current_app, request, session, g
+
+#----------------------------------------------------------------------------#
+# Conditional GET.
+#----------------------------------------------------------------------------#
+
+# A read view declares a freshness function, running one cheap aggregate query over
+# the updated_at columns of what the page shows. Its result becomes the ETag and
+# Last-Modified of the page, and a matching If-None-Match / If-Modified-Since is
+# answered with a 304 before the view runs its own queries.
+
+
+def last_modified(updated_ats, passed_show_date=None):
+    # latest of the updated_at timestamps (UTC) and of the date (local time) of the
+    # last show that moved from upcoming to past, which changes the page as well
+    times = [updated_at.replace(tzinfo=timezone.utc) for updated_at in updated_ats if updated_at]
+    if passed_show_date:
+        times.append(passed_show_date.astimezone(timezone.utc))
+    return max(times) if times else None
+
+
+def compute_etag(parts):
+    config = current_app.config
+    # pages embed a CSRF token, which must not outlive its time limit in a browser cache
+    csrf_period = None
+    if config.get('WTF_CSRF_ENABLED', True) and config.get('WTF_CSRF_TIME_LIMIT', 3600):
+        csrf_period = int(time.time() // (config.get('WTF_CSRF_TIME_LIMIT', 3600) / 2))
+    seed = repr((config.get('ETAG_VERSION'), request.full_path, g.get('locale'), csrf_period, parts))
+    return hashlib.sha1(seed.encode('utf-8')).hexdigest()
+
+
+def not_modified(etag, modified):
+    if request.if_none_match:
+        # compressed responses carry the weak form of the ETag
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and modified:
+        return modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def conditional(freshness):
+    # freshness(**view_args) returns (last modified, etag parts), or None when the
+    # view must run anyway, e.g. to answer a 404
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            # flashed messages are shown once, pages showing them are always rendered
+            if '_flashes' in session:
+                return view(**kwargs)
+            state = freshness(**kwargs)
+            if state is None:
+                return view(**kwargs)
+            modified, parts = state
+            etag = compute_etag(parts)
+            # the page cache keys pages with it, see PageCache.cached
+            g.etag = etag
+
+            if not_modified(etag, modified):
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.make_response(view(**kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.last_modified = modified
+            # pages hold a per-session CSRF token: browsers may keep them, shared caches may not
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            # pages are rendered in the locale picked from Accept-Language
+            response.vary.add('Accept-Language')
+            return response
+        return wrapper
+    return decorator
@@ -7,17 +7,111 @@ from urllib.parse import quote_plus
 from dotenv import load_dotenv
 # Load env variables
 load_dotenv()
-SECRET_KEY = os.urandom(32)
+# SECRET_KEY is required in production (wsgi.py refuses to start without it):
+# the processes must all sign sessions and CSRF tokens with the same key. The
+# random key is only for the development server.
+SECRET_KEY = os.getenv('SECRET_KEY') or os.urandom(32)
 # Grabs the folder where the script runs.
 basedir = os.path.abspath(os.path.dirname(__file__))
 
-# Enable debug mode.
-DEBUG = True
+# Enable debug mode, from FLASK_DEBUG as for `flask run`, off by default.
+DEBUG = os.getenv('FLASK_DEBUG', '').lower() in ('1', 'true', 'yes')
 
 # Connect to the database
 # Thanks to coach Baidou for hints, See https://github.com/badiou/session3-fsdn
-db_username=quote_plus(os.getenv('DB_USERNAME'))
-db_password=quote_plus(os.getenv('DB_PASSWORD'))
-db_name=quote_plus(os.getenv('DB_NAME'))
-SQLALCHEMY_DATABASE_URI = 'postgresql://{}:{}@localhost:5432/{}'.format(db_username, db_password, db_name)
-SQLALCHEMY_TRACK_MODIFICATIONS= False
\ No newline at end of file
+# DATABASE_URL, as set by hosting platforms, takes precedence over the DB_* variables
+if os.getenv('DATABASE_URL'):
+    # SQLAlchemy only knows the postgresql:// scheme
+    SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL').replace('postgres://', 'postgresql://', 1)
+else:
+    db_username=quote_plus(os.getenv('DB_USERNAME'))
+    db_password=quote_plus(os.getenv('DB_PASSWORD'))
+    db_name=quote_plus(os.getenv('DB_NAME'))
+    db_host=os.getenv('DB_HOST', 'localhost:5432')
+    SQLALCHEMY_DATABASE_URI = 'postgresql://{}:{}@{}/{}'.format(db_username, db_password, db_host, db_name)
+SQLALCHEMY_TRACK_MODIFICATIONS= False
+
+# Read replicas, as a comma separated list of database URLs. Read-only views are
+# served by one of them, except for clients who wrote something within the last
+# REPLICA_LAG_WINDOW seconds, who keep reading from the primary.
+SQLALCHEMY_BINDS = {
+    'replica{}'.format(index): url.strip().replace('postgres://', 'postgresql://', 1)
+    for index, url in enumerate(os.getenv('DATABASE_REPLICA_URLS', '').split(',')) if url.strip()
+}
+REPLICA_LAG_WINDOW = float(os.getenv('REPLICA_LAG_WINDOW', 5))
+
+# Connection pool of each process. A gunicorn worker never runs more threads than
+# DB_POOL_SIZE + DB_MAX_OVERFLOW, see gunicorn.conf.py.
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 5))
+# Statements running longer than this are cancelled by postgres, 0 to disable
+DB_STATEMENT_TIMEOUT = int(os.getenv('DB_STATEMENT_TIMEOUT', 15000))
+
+SQLALCHEMY_ENGINE_OPTIONS = {
+    # recycle connections before server or proxy side idle timeouts close them
+    'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+    'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+}
+if SQLALCHEMY_DATABASE_URI.startswith('postgresql'):
+    SQLALCHEMY_ENGINE_OPTIONS.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=int(os.getenv('DB_POOL_TIMEOUT', 10))
+    )
+    if DB_STATEMENT_TIMEOUT:
+        SQLALCHEMY_ENGINE_OPTIONS['connect_args'] = {
+            'options': '-c statement_timeout={}'.format(DB_STATEMENT_TIMEOUT)}
+
+# Number of shows listed per page on /shows
+SHOWS_PER_PAGE = 30
+
+# Rows read at a time from the server-side cursors of the streamed pages (/artists)
+STREAM_BATCH_SIZE = 500
+
+# Maximum number of results returned by a search
+SEARCH_RESULTS_LIMIT = 50
+
+# Page cache: 'lru' (in-process), 'redis' (shared by all workers) or 'null' (disabled)
+CACHE_TYPE = os.getenv('CACHE_TYPE', 'lru')
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+CACHE_DEFAULT_TTL = 60
+CACHE_MAX_ENTRIES = 1024
+
+# Part of every ETag, change it on deploy to expire pages kept by browsers
+ETAG_VERSION = os.getenv('RELEASE', '')
+
+# Request instrumentation: Server-Timing headers, and warnings for statement shapes
+# repeated more than N_PLUS_ONE_THRESHOLD times in a request (N+1 queries) and for
+# statements slower than SLOW_QUERY_THRESHOLD seconds
+SERVER_TIMING = os.getenv('SERVER_TIMING', 'true').lower() in ('1', 'true', 'yes')
+N_PLUS_ONE_THRESHOLD = int(os.getenv('N_PLUS_ONE_THRESHOLD', 10))
+SLOW_QUERY_THRESHOLD = float(os.getenv('SLOW_QUERY_THRESHOLD', 0.5))
+
+# Compiled templates, shared by the processes of a host (by default a temporary
+# directory private to the user running them), and per-process cache of
+# {% cache %} fragments
+JINJA_CACHE_DIR = os.getenv('JINJA_CACHE_DIR')
+FRAGMENT_CACHE = True
+FRAGMENT_CACHE_MAX_ENTRIES = 10000
+
+# Locales of the pages, picked from the Accept-Language header, the first one
+# being the default
+LANGUAGES = os.getenv('LANGUAGES', 'en').split(',')
+
+# Compression of responses with brotli or gzip, as accepted by the client: only
+# the types listed here, at their level per encoding (gzip 1-9, brotli 0-11), and
+# only bodies of at least COMPRESS_MIN_SIZE bytes. Exports are large and
+# streamed, they get cheaper levels.
+COMPRESS = os.getenv('COMPRESS', 'true').lower() in ('1', 'true', 'yes')
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 500))
+COMPRESS_LEVELS = {
+    'text/html': {'gzip': 6, 'br': 5},
+    'text/css': {'gzip': 6, 'br': 5},
+    'text/javascript': {'gzip': 6, 'br': 5},
+    'application/javascript': {'gzip': 6, 'br': 5},
+    'application/json': {'gzip': 6, 'br': 5},
+    'image/svg+xml': {'gzip': 6, 'br': 5},
+    'text/plain': {'gzip': 6, 'br': 5},
+    'text/csv': {'gzip': 1, 'br': 1},
+    'application/x-ndjson': {'gzip': 1, 'br': 1}
+}
@@ -0,0 +1,164 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import csv
+import io
+import json
+import sys
+import zlib
+from datetime import datetime
+import click
+from flask import Blueprint, Response, abort, stream_with_context
+from flask.cli import with_appcontext
+from sqlalchemy import func, select
+from sqlalchemy.orm import aliased
+from replicas import read_only
+from models import db, Venue, Artist, Show, Location, Genre, venues_genres, artists_genres
+
+#----------------------------------------------------------------------------#
+# Bulk export.
+#----------------------------------------------------------------------------#
+
+# The catalog is exported by `flask export` and under /export/<table>.<format>,
+# as CSV or JSONL, optionally gzipped. Rows are read from a server-side cursor
+# (yield_per) and written out a batch at a time, so memory stays constant
+# whatever the size of the tables.
+
+FORMATS = ('csv', 'jsonl')
+
+# rows fetched from the cursor and written out at a time
+BATCH_SIZE = 1000
+
+exports = Blueprint('exports', __name__, url_prefix='/export')
+
+
+def genre_names(links_table, key_column, entity_id):
+    # comma separated genres of each venue or artist, as a correlated subquery
+    # served by the index on the association table
+    if db.engine.dialect.name == 'postgresql':
+        aggregate = func.string_agg(Genre.name, ',')
+    else:
+        aggregate = func.group_concat(Genre.name, ',')
+    return select(aggregate).select_from(links_table).\
+        join(Genre, Genre.id == links_table.c.genre_id).\
+        where(links_table.c[key_column] == entity_id).scalar_subquery()
+
+
+def venues_query():
+    return select(
+        Venue.id, Venue.name, Venue.address, Location.city, Location.state, Venue.phone,
+        genre_names(venues_genres, 'venue_id', Venue.id).label('genres'),
+        Venue.image_link, Venue.facebook_link, Venue.venue_website.label('website'),
+        Venue.seeking_talents.label('seeking_talent'), Venue.seeking_description, Venue.updated_at
+    ).outerjoin(Location, Venue.location_id == Location.id).order_by(Venue.id)
+
+
+def artists_query():
+    return select(
+        Artist.id, Artist.name, Location.city, Location.state, Artist.phone,
+        genre_names(artists_genres, 'artist_id', Artist.id).label('genres'),
+        Artist.image_link, Artist.facebook_link, Artist.artist_website.label('website'),
+        Artist.seeking_venues.label('seeking_venue'), Artist.seeking_description, Artist.updated_at
+    ).outerjoin(Location, Artist.location_id == Location.id).order_by(Artist.id)
+
+
+def shows_query():
+    # the venue and artist columns of the /shows listing, with their locations
+    venue_location = aliased(Location)
+    artist_location = aliased(Location)
+    return select(
+        Show.id, Show.show_date.label('start_time'),
+        Show.venue_id, Venue.name.label('venue_name'),
+        venue_location.city.label('venue_city'), venue_location.state.label('venue_state'),
+        Show.artist_id, Artist.name.label('artist_name'), Artist.image_link.label('artist_image_link'),
+        artist_location.city.label('artist_city'), artist_location.state.label('artist_state'),
+        Show.updated_at
+    ).join(Venue, Show.venue_id == Venue.id).join(Artist, Show.artist_id == Artist.id).\
+        outerjoin(venue_location, Venue.location_id == venue_location.id).\
+        outerjoin(artist_location, Artist.location_id == artist_location.id).\
+        order_by(Show.id)
+
+
+QUERIES = {
+    'venues': venues_query,
+    'artists': artists_query,
+    'shows': shows_query
+}
+
+
+def serialize(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def export_batches(table):
+    # (column names, batches of rows) of a table, streamed from a server-side cursor
+    result = db.session.execute(QUERIES[table](), execution_options={'yield_per': BATCH_SIZE})
+    return list(result.keys()), result.partitions()
+
+
+def csv_chunks(columns, batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for batch in batches:
+        writer.writerows([serialize(value) for value in row] for row in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def jsonl_chunks(columns, batches):
+    for batch in batches:
+        yield ''.join(json.dumps(dict(zip(columns, map(serialize, row)))) + '\n' for row in batch)
+
+
+def encoded_chunks(chunks, compress=False):
+    # UTF-8 chunks of the export, gzipped incrementally when asked to
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    for chunk in chunks:
+        data = chunk.encode('utf-8')
+        if compressor:
+            data = compressor.compress(data)
+        if data:
+            yield data
+    if compressor:
+        yield compressor.flush()
+
+
+def export_chunks(table, format, compress=False):
+    columns, batches = export_batches(table)
+    chunks = csv_chunks(columns, batches) if format == 'csv' else jsonl_chunks(columns, batches)
+    return encoded_chunks(chunks, compress)
+
+
+@exports.route('/<table>.<format>')
+@exports.route('/<table>.<format>.gz', defaults={'compress': True})
+@read_only
+def export(table, format, compress=False):
+    if table not in QUERIES or format not in FORMATS:
+        abort(404)
+    filename = '{}.{}{}'.format(table, format, '.gz' if compress else '')
+    response = Response(stream_with_context(export_chunks(table, format, compress)),
+                        mimetype='application/gzip' if compress else
+                        'text/csv' if format == 'csv' else 'application/x-ndjson')
+    response.headers['Content-Disposition'] = 'attachment; filename=' + filename
+    return response
+
+
+@click.command('export')
+@click.argument('table', type=click.Choice(list(QUERIES)))
+@click.option('--format', 'format', type=click.Choice(FORMATS), default='csv', show_default=True)
+@click.option('--gzip', 'compress', is_flag=True, help='Gzip the output.')
+@click.option('--output', '-o', type=click.Path(dir_okay=False), help='Output file, stdout by default.')
+@with_appcontext
+def export_command(table, format, compress, output):
+    """Export venues, artists or shows as CSV or JSONL."""
+    target = open(output, 'wb') if output else sys.stdout.buffer
+    try:
+        for data in export_chunks(table, format, compress):
+            target.write(data)
+    finally:
+        if output:
+            target.close()
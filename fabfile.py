@@ -6,9 +6,9 @@ from fabric.contrib.console import confirm
 
 def test():
     with settings(warn_only=True):
-        result = local(
-            "python test_tasks.py -v && python test_users.py -v", capture=True
-        )
+        # the tests, with every route benchmarked at several data scales, failing
+        # on errors and on statement counts growing with the data
+        result = local("python -m pytest", capture=True)
     if result.failed and not confirm("Tests failed. Continue?"):
         abort("Aborted at user request.")
 
@@ -39,9 +39,7 @@ def heroku():
 
 
 def heroku_test():
-    local(
-        "heroku run python test_tasks.py -v && heroku run python test_users.py -v"
-    )
+    local("heroku run \"pip install -r requirements-dev.txt && python -m pytest\"")
 
 
 def deploy():
@@ -0,0 +1,43 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import multiprocessing
+import os
+
+#----------------------------------------------------------------------------#
+# Gunicorn config.
+#----------------------------------------------------------------------------#
+
+# Workers are processes with their own connection pool, each of them running
+# threads. A thread holds at most one connection, so there are never more threads
+# than pooled connections, and never more pools than the database accepts:
+#   workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) <= DB_MAX_CONNECTIONS
+
+wsgi_app = 'wsgi:app'
+bind = '0.0.0.0:{}'.format(os.getenv('PORT', 5000))
+
+pool_size = int(os.getenv('DB_POOL_SIZE', 5))
+max_overflow = int(os.getenv('DB_MAX_OVERFLOW', 5))
+# connections left to the app, keep some for migrations and maintenance
+max_connections = int(os.getenv('DB_MAX_CONNECTIONS', 90))
+
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', pool_size))
+workers = int(os.getenv('WEB_CONCURRENCY', min(
+    multiprocessing.cpu_count() * 2 + 1, max(1, max_connections // (pool_size + max_overflow)))))
+
+if threads > pool_size + max_overflow:
+    raise ValueError('GUNICORN_THREADS must not exceed DB_POOL_SIZE + DB_MAX_OVERFLOW')
+
+# the app is imported in each worker, after the fork, never sharing connections
+preload_app = False
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+# restart workers now and then, bounding the growth of their in-process caches
+max_requests = 2000
+max_requests_jitter = 200
+
+accesslog = '-'
+errorlog = '-'
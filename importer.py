@@ -0,0 +1,267 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import csv
+import gzip
+import json
+import time
+from itertools import islice
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import insert, select
+from werkzeug.datastructures import MultiDict
+from forms import VenueForm, ArtistForm, ShowForm
+from locations import resolve_locations
+from models import db, Venue, Artist, Show, Genre, venues_genres, artists_genres
+import stats
+
+#----------------------------------------------------------------------------#
+# Bulk import.
+#----------------------------------------------------------------------------#
+
+# `flask import venues|artists|shows FILE` streams a CSV or JSONL file (optionally
+# gzipped) through a pipeline of generators: rows are read one at a time, validated
+# with the rules of the web forms, grouped in chunks and inserted with one
+# executemany per table and chunk, each chunk in its own transaction. Only one
+# chunk is ever held in memory. Rows use the field names of the forms, genres
+# being a list in JSONL and a comma separated string in CSV.
+
+# the form validating the rows of each entity
+FORMS = {
+    'venues': VenueForm,
+    'artists': ArtistForm,
+    'shows': ShowForm
+}
+
+# fields a form fills with a default when they are missing, e.g. the start time
+# of a show with the time forms.py was imported, which rows must have instead
+REQUIRED_FIELDS = {
+    'shows': ['start_time']
+}
+
+# values of boolean columns read as False
+FALSE_VALUES = ('', '0', 'false', 'no', 'n', 'off')
+
+
+def open_file(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, encoding='utf-8', newline='')
+
+
+def read_rows(path):
+    # (line number, row dict) of a .csv or .jsonl file, one at a time
+    with open_file(path) as source:
+        if '.csv' in path:
+            reader = csv.DictReader(source)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_number, line in enumerate(source, 1):
+                if line.strip():
+                    try:
+                        yield line_number, json.loads(line)
+                    except ValueError as error:
+                        yield line_number, error
+
+
+def form_data(row):
+    # the row as the form data the web forms would receive
+    data = MultiDict()
+    for name, value in row.items():
+        if value is None:
+            continue
+        if name == 'genres':
+            values = value if isinstance(value, list) else value.split(',')
+            for genre in values:
+                if genre.strip():
+                    data.add(name, genre.strip())
+        elif isinstance(value, bool) or (name.startswith('seeking_') and name != 'seeking_description'):
+            # unchecked boxes are not sent at all
+            if str(value).strip().lower() not in FALSE_VALUES:
+                data.add(name, 'y')
+        else:
+            data.add(name, str(value))
+    return data
+
+
+def validate_rows(entity, rows):
+    # (line number, form, None) of valid rows, (line number, row, errors) of the others
+    form_class = FORMS[entity]
+    for line_number, row in rows:
+        if not isinstance(row, dict):
+            yield line_number, row, {'row': [str(row)]}
+            continue
+        missing = [name for name in REQUIRED_FIELDS.get(entity, ()) if not str(row.get(name) or '').strip()]
+        if missing:
+            yield line_number, row, {name: ['This field is required.'] for name in missing}
+            continue
+        form = form_class(formdata=form_data(row), meta={'csrf': False})
+        if form.validate():
+            yield line_number, form, None
+        else:
+            yield line_number, row, form.errors
+
+
+def chunked(items, size):
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def genre_ids(names):
+    # {name: id} of the genres, inserting the missing ones
+    ids = dict(db.session.execute(select(Genre.name, Genre.id).where(Genre.name.in_(names))).all())
+    missing = [{'name': name} for name in names if name not in ids]
+    if missing:
+        ids.update(db.session.execute(
+            insert(Genre).returning(Genre.name, Genre.id), missing).all())
+    return ids
+
+
+def insert_entities(model, links_table, link_column, rows, genres):
+    # insert venues or artists with their genres, ids being returned in the order
+    # of the rows to link each of them to its genres. Postgres returns them from
+    # batched statements, SQLite can't guarantee the order and gets one per row.
+    ids = db.session.execute(
+        insert(model).returning(model.id, sort_by_parameter_order=True), rows).scalars().all()
+    ids_by_genre = genre_ids({name for names in genres for name in names})
+    links = [{'genre_id': ids_by_genre[name], link_column: entity_id}
+             for entity_id, names in zip(ids, genres) for name in set(names)]
+    if links:
+        db.session.execute(insert(links_table), links)
+    return len(ids)
+
+
+def import_venues(valid):
+    forms = [form for _, form in valid]
+    locations = resolve_locations([(form.city.data, form.state.data) for form in forms])
+    rows = [{
+        'name': form.name.data, 'location_id': locations[(form.city.data, form.state.data)],
+        'address': form.address.data, 'phone': form.phone.data, 'image_link': form.image_link.data,
+        'facebook_link': form.facebook_link.data, 'venue_website': form.website_link.data,
+        'seeking_talents': form.seeking_talent.data, 'seeking_description': form.seeking_description.data
+    } for form in forms]
+    imported = insert_entities(Venue, venues_genres, 'venue_id', rows, [form.genres.data for form in forms])
+    return imported, set(), []
+
+
+def import_artists(valid):
+    forms = [form for _, form in valid]
+    locations = resolve_locations([(form.city.data, form.state.data) for form in forms])
+    rows = [{
+        'name': form.name.data, 'location_id': locations[(form.city.data, form.state.data)],
+        'phone': form.phone.data, 'image_link': form.image_link.data,
+        'facebook_link': form.facebook_link.data, 'artist_website': form.website_link.data,
+        'seeking_venues': form.seeking_venue.data, 'seeking_description': form.seeking_description.data
+    } for form in forms]
+    imported = insert_entities(Artist, artists_genres, 'artist_id', rows, [form.genres.data for form in forms])
+    return imported, set(), []
+
+
+def existing_ids(model, ids):
+    return set(db.session.execute(select(model.id).where(model.id.in_(ids))).scalars())
+
+
+def import_shows(valid):
+    # the show form does not check its venue and artist, unknown ones are rejected here
+    rejected = []
+    pairs = []
+    for line_number, form in valid:
+        try:
+            pairs.append((line_number, int(form.venue_id.data), int(form.artist_id.data), form))
+        except (TypeError, ValueError):
+            rejected.append((line_number, form.data, {'venue_id, artist_id': ['Not a valid id.']}))
+    venue_ids = existing_ids(Venue, {venue_id for _, venue_id, _, _ in pairs})
+    artist_ids = existing_ids(Artist, {artist_id for _, _, artist_id, _ in pairs})
+
+    rows = []
+    for line_number, venue_id, artist_id, form in pairs:
+        if venue_id not in venue_ids or artist_id not in artist_ids:
+            rejected.append((line_number, form.data, {'venue_id, artist_id': ['No such venue or artist.']}))
+        else:
+            rows.append({'venue_id': venue_id, 'artist_id': artist_id, 'show_date': form.start_time.data})
+    if rows:
+        db.session.execute(insert(Show), rows)
+        # recount the venues and artists of the new shows
+        stats.refresh({row['venue_id'] for row in rows}, {row['artist_id'] for row in rows})
+    # pages of the venues and artists of the new shows
+    tags = {'venue:{}'.format(row['venue_id']) for row in rows} | \
+        {'artist:{}'.format(row['artist_id']) for row in rows}
+    return len(rows), tags, rejected
+
+
+IMPORTS = {
+    'venues': import_venues,
+    'artists': import_artists,
+    'shows': import_shows
+}
+
+
+def run_import(entity, path, chunk_size, reject):
+    # import a file chunk by chunk, yielding (rows imported, cache tags) per chunk
+    for chunk in chunked(validate_rows(entity, read_rows(path)), chunk_size):
+        valid = []
+        for line_number, item, errors in chunk:
+            if errors:
+                reject(line_number, item, errors)
+            else:
+                valid.append((line_number, item))
+        if not valid:
+            yield 0, set()
+            continue
+        try:
+            imported, tags, rejected = IMPORTS[entity](valid)
+            db.session.commit()
+        except Exception as error:
+            # a chunk is all or nothing
+            db.session.rollback()
+            message = str(error).splitlines()[0]
+            imported, tags = 0, set()
+            rejected = [(line_number, form.data, {'database': [message]}) for line_number, form in valid]
+        finally:
+            db.session.expunge_all()
+        for line_number, row, errors in rejected:
+            reject(line_number, row, errors)
+        yield imported, tags
+
+
+@click.command('import')
+@click.argument('entity', type=click.Choice(list(FORMS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--chunk-size', default=1000, show_default=True, help='Rows inserted per transaction.')
+@click.option('--rejects', type=click.File('w'), help='Write rejected rows to this JSONL file.')
+@with_appcontext
+def import_command(entity, path, chunk_size, rejects):
+    """Import venues, artists or shows from a CSV or JSONL file."""
+    counts = {'imported': 0, 'rejected': 0}
+
+    def reject(line_number, row, errors):
+        counts['rejected'] += 1
+        if rejects:
+            rejects.write(json.dumps({'line': line_number, 'row': row, 'errors': errors}, default=str) + '\n')
+        else:
+            click.echo('line {}: {}'.format(line_number, errors), err=True)
+
+    started = time.monotonic()
+    tags = {entity}
+    for imported, chunk_tags in run_import(entity, path, chunk_size, reject):
+        counts['imported'] += imported
+        tags |= chunk_tags
+        elapsed = time.monotonic() - started
+        click.echo('{imported} imported, {rejected} rejected, {rate:.0f} rows/s'.format(
+            rate=(counts['imported'] + counts['rejected']) / elapsed if elapsed else 0, **counts))
+
+    if entity == 'shows':
+        tags.add('venues')
+    # only reaches the web workers with a shared cache backend
+    page_cache = current_app.extensions.get('page_cache')
+    if page_cache is not None and counts['imported']:
+        page_cache.invalidate(*tags)
+    click.echo('Done in {:.1f}s: {imported} imported, {rejected} rejected.'.format(
+        time.monotonic() - started, **counts))
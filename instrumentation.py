@@ -0,0 +1,197 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from flask import g, has_request_context, request, before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+#----------------------------------------------------------------------------#
+# Metrics.
+#----------------------------------------------------------------------------#
+
+# Metrics are kept per process, in the Prometheus text format. With several
+# gunicorn workers, each scrape reads the worker that answers it.
+
+
+class Histogram:
+    # Prometheus histogram labelled by endpoint
+
+    def __init__(self, name, description, buckets):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self.counts = defaultdict(lambda: [0] * len(buckets))
+        self.sums = defaultdict(float)
+        self.totals = defaultdict(int)
+
+    def observe(self, endpoint, value):
+        counts = self.counts[endpoint]
+        for i, bucket in enumerate(self.buckets):
+            if value <= bucket:
+                counts[i] += 1
+        self.sums[endpoint] += value
+        self.totals[endpoint] += 1
+
+    def render(self):
+        lines = ['# HELP {} {}'.format(self.name, self.description), '# TYPE {} histogram'.format(self.name)]
+        for endpoint in sorted(self.totals):
+            for bucket, count in zip(self.buckets, self.counts[endpoint]):
+                lines.append('{}_bucket{{endpoint="{}",le="{}"}} {}'.format(self.name, endpoint, bucket, count))
+            lines.append('{}_bucket{{endpoint="{}",le="+Inf"}} {}'.format(self.name, endpoint, self.totals[endpoint]))
+            lines.append('{}_sum{{endpoint="{}"}} {}'.format(self.name, endpoint, self.sums[endpoint]))
+            lines.append('{}_count{{endpoint="{}"}} {}'.format(self.name, endpoint, self.totals[endpoint]))
+        return lines
+
+
+class Counters:
+    # Prometheus counter labelled by endpoint
+
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self.values = defaultdict(int)
+
+    def inc(self, endpoint, value=1):
+        self.values[endpoint] += value
+
+    def render(self):
+        lines = ['# HELP {} {}'.format(self.name, self.description), '# TYPE {} counter'.format(self.name)]
+        for endpoint in sorted(self.values):
+            lines.append('{}{{endpoint="{}"}} {}'.format(self.name, endpoint, self.values[endpoint]))
+        return lines
+
+#----------------------------------------------------------------------------#
+# Request instrumentation.
+#----------------------------------------------------------------------------#
+
+# Every request records the number and duration of its SQL statements (from the
+# cursor events of every engine, replicas included), its template rendering time
+# and its slowest statement. They are sent back in a Server-Timing header, fed to
+# the /metrics histograms, and checked for N+1 patterns: one statement shape
+# running more than N_PLUS_ONE_THRESHOLD times within a request.
+
+SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STATEMENTS = (1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+# bound parameters, and lists of them as expanded by IN clauses
+PARAMETER_LIST = re.compile(r'\(\s*(\?|%\(\w+\)s|%s|\$\d+)(\s*,\s*(\?|%\(\w+\)s|%s|\$\d+))*\s*\)')
+
+
+def statement_shape(statement):
+    # statements differing only by the length of their IN lists have the same shape
+    return PARAMETER_LIST.sub('(?)', statement)
+
+
+class Instrumentation:
+    # Per-request SQL and template timings, /metrics and N+1 detection
+
+    def __init__(self, app=None):
+        self.lock = threading.Lock()
+        self.requests = Histogram('fyyur_request_duration_seconds', 'Time spent serving requests.', SECONDS)
+        self.db_time = Histogram('fyyur_request_db_seconds', 'Time spent in SQL statements per request.', SECONDS)
+        self.statements = Histogram('fyyur_request_statements', 'SQL statements run per request.', STATEMENTS)
+        self.render_time = Histogram('fyyur_request_render_seconds', 'Time spent rendering templates per request.',
+                                     SECONDS)
+        self.n_plus_one = Counters('fyyur_n_plus_one_total', 'Requests running a statement shape too many times.')
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['instrumentation'] = self
+        app.before_request(self.start_request)
+        app.after_request(self.end_request)
+        event.listen(Engine, 'before_cursor_execute', self.before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', self.after_cursor_execute)
+        before_render_template.connect(self.before_render, app)
+        template_rendered.connect(self.after_render, app)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+
+    def start_request(self):
+        g.request_started = time.perf_counter()
+        g.sql = {'count': 0, 'time': 0.0, 'slowest': (0.0, None), 'shapes': Counter()}
+        g.render_time = 0.0
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # kept on the execution context, dropped with it when the statement fails
+        # and after_cursor_execute never runs
+        if context is not None:
+            context._query_started = time.perf_counter()
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, '_query_started', None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        sql = g.get('sql') if has_request_context() else None
+        if sql is None:
+            return
+        sql['count'] += 1
+        sql['time'] += elapsed
+        sql['shapes'][statement_shape(statement)] += 1
+        if elapsed > sql['slowest'][0]:
+            sql['slowest'] = (elapsed, statement)
+
+    def before_render(self, app, template, context):
+        g.render_started = time.perf_counter()
+
+    def after_render(self, app, template, context):
+        started = g.pop('render_started', None)
+        if started is not None:
+            g.render_time += time.perf_counter() - started
+
+    def end_request(self, response):
+        sql = g.get('sql')
+        if sql is None:
+            return response
+        state = g._get_current_object()
+        endpoint = request.endpoint or 'none'
+        path = request.path
+        if self.app.config['SERVER_TIMING']:
+            # a streamed page is rendered after its headers: they only tell the
+            # statements run and the time spent before the first byte
+            response.headers.add('Server-Timing', 'db;dur={:.2f};desc="{} statements"'.format(
+                sql['time'] * 1000, sql['count']))
+            if not response.is_streamed:
+                response.headers.add('Server-Timing', 'render;dur={:.2f}'.format(g.render_time * 1000))
+            response.headers.add('Server-Timing', 'app;dur={:.2f}'.format(
+                (time.perf_counter() - g.request_started) * 1000))
+        if response.is_streamed:
+            # recorded once the page is sent, with the statements and the rendering done while streaming
+            response.call_on_close(lambda: self.record(endpoint, path, state))
+        else:
+            self.record(endpoint, path, state)
+        return response
+
+    def record(self, endpoint, path, state):
+        duration = time.perf_counter() - state.request_started
+        sql = state.sql
+        config = self.app.config
+
+        repeated = [(count, shape) for shape, count in sql['shapes'].items()
+                    if count > config['N_PLUS_ONE_THRESHOLD']]
+        for count, shape in repeated:
+            self.app.logger.warning('N+1 on %s: %d runs of %s', path, count, shape)
+        slowest, statement = sql['slowest']
+        if slowest > config['SLOW_QUERY_THRESHOLD']:
+            self.app.logger.warning('Slow statement on %s: %.3fs %s', path, slowest, statement)
+
+        with self.lock:
+            self.requests.observe(endpoint, duration)
+            self.db_time.observe(endpoint, sql['time'])
+            self.statements.observe(endpoint, sql['count'])
+            self.render_time.observe(endpoint, state.render_time)
+            if repeated:
+                self.n_plus_one.inc(endpoint)
+
+    def metrics_view(self):
+        with self.lock:
+            lines = []
+            for metric in (self.requests, self.db_time, self.statements, self.render_time, self.n_plus_one):
+                lines += metric.render()
+        return '\n'.join(lines) + '\n', 200, {'Content-Type': 'text/plain; version=0.0.4'}
@@ -0,0 +1,97 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import threading
+from sqlalchemy import event, select, tuple_
+from models import db, Location, insert_ignoring_conflicts
+
+#----------------------------------------------------------------------------#
+# Location resolver.
+#----------------------------------------------------------------------------#
+
+# Venues and artists share Location rows, unique by (city, state). Ids are
+# resolved from an in-process cache, and missing locations are inserted with
+# INSERT ... ON CONFLICT DO NOTHING in the caller's transaction, so concurrent
+# submissions can't create duplicates and nothing is committed before the venue
+# or artist itself. Locations are never deleted, so cached ids never go stale.
+
+# (city, state) -> id of committed locations
+location_ids = {}
+lock = threading.Lock()
+warmed = False
+
+
+def warm_location_cache():
+    # load every known location in the cache
+    global warmed
+    rows = db.session.execute(select(Location.id, Location.city, Location.state)).all()
+    with lock:
+        location_ids.update(((city, state), location_id) for location_id, city, state in rows)
+        warmed = True
+
+
+def select_locations(pairs):
+    return db.session.execute(select(Location.id, Location.city, Location.state).where(
+        tuple_(Location.city, Location.state).in_(pairs))).all()
+
+
+def resolve_locations(pairs):
+    # {(city, state): id} for the given pairs, inserting the missing locations
+    # in the current transaction, in one INSERT and at most one SELECT
+    if not warmed:
+        warm_location_cache()
+    ids = {pair: location_ids[pair] for pair in pairs if pair in location_ids}
+    missing = list({pair for pair in pairs if pair not in ids})
+    if not missing:
+        return ids
+
+    values = [{'city': city, 'state': state} for city, state in missing]
+    statement = insert_ignoring_conflicts(Location, [Location.city, Location.state])
+    # insert_returning is only known to SQLAlchemy 2.0, postgres always had RETURNING
+    dialect = db.engine.dialect
+    returning = getattr(dialect, 'insert_returning', dialect.name == 'postgresql')
+    if statement is None:
+        # no upsert support: plain inserts of the locations not found
+        rows = select_locations(missing)
+        known = {(city, state) for location_id, city, state in rows}
+        new_locations = [Location(city=city, state=state) for city, state in missing
+                         if (city, state) not in known]
+        db.session.add_all(new_locations)
+        db.session.flush()
+        rows += [(location.id, location.city, location.state) for location in new_locations]
+    elif returning:
+        rows = db.session.execute(statement.values(values).returning(
+            Location.id, Location.city, Location.state)).all()
+        # locations that already existed are not returned by the insert
+        inserted = {(city, state) for location_id, city, state in rows}
+        conflicting = [pair for pair in missing if pair not in inserted]
+        if conflicting:
+            rows += select_locations(conflicting)
+    else:
+        db.session.execute(statement.values(values))
+        rows = select_locations(missing)
+
+    resolved = {(city, state): location_id for location_id, city, state in rows}
+    ids.update(resolved)
+    # only cache them once committed, a rollback would make the ids dangle
+    db.session.info.setdefault('pending_locations', {}).update(resolved)
+    return ids
+
+
+def resolve_location(city, state):
+    # id of the location of a venue or artist, see resolve_locations
+    return resolve_locations([(city, state)])[(city, state)]
+
+
+@event.listens_for(db.session, 'after_commit')
+def cache_committed_locations(session):
+    pending = session.info.pop('pending_locations', None)
+    if pending:
+        with lock:
+            location_ids.update(pending)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def forget_rolled_back_locations(session):
+    session.info.pop('pending_locations', None)
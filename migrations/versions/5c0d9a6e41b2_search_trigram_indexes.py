@@ -0,0 +1,41 @@
+"""search trigram indexes
+
+Revision ID: 5c0d9a6e41b2
+Revises: 17a3e91f2ef4
+Create Date: 2026-10-18 09:12:44.518203
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5c0d9a6e41b2'
+down_revision = '17a3e91f2ef4'
+branch_labels = None
+depends_on = None
+
+# (index, table, column) served by a pg_trgm GIN index on postgres
+TRIGRAM_INDEXES = [
+    ('ix_venues_name_trgm', 'venues', 'name'),
+    ('ix_venues_venue_genres_trgm', 'venues', 'venue_genres'),
+    ('ix_artists_name_trgm', 'artists', 'name'),
+    ('ix_artists_artist_genres_trgm', 'artists', 'artist_genres'),
+    ('ix_locations_city_trgm', 'locations', 'city'),
+]
+
+
+def upgrade():
+    postgresql = op.get_bind().dialect.name == 'postgresql'
+    if postgresql:
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for index, table, column in TRIGRAM_INDEXES:
+        if postgresql:
+            op.create_index(index, table, [column], postgresql_using='gin',
+                            postgresql_ops={column: 'gin_trgm_ops'})
+        else:
+            op.create_index(index, table, [column])
+
+
+def downgrade():
+    for index, table, column in TRIGRAM_INDEXES:
+        op.drop_index(index, table_name=table)
@@ -0,0 +1,52 @@
+"""indexes and constraints
+
+Revision ID: 7a9c3d5e2f16
+Revises: e41f6a2b7d08
+Create Date: 2026-10-18 15:20:41.903577
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '7a9c3d5e2f16'
+down_revision = 'e41f6a2b7d08'
+branch_labels = None
+depends_on = None
+
+# (index, table, columns), matching the filters and joins of the controllers
+INDEXES = [
+    ('ix_shows_venue_id_show_date', 'shows', ['venue_id', 'show_date']),
+    ('ix_shows_artist_id_show_date', 'shows', ['artist_id', 'show_date']),
+    ('ix_shows_show_date_id', 'shows', ['show_date', 'id']),
+    ('ix_venues_location_id', 'venues', ['location_id']),
+    ('ix_artists_location_id', 'artists', ['location_id']),
+]
+
+
+def upgrade():
+    for index, table, columns in INDEXES:
+        op.create_index(index, table, columns)
+
+    # merge duplicated locations into the first one before making them unique
+    for table in ('venues', 'artists'):
+        op.execute(
+            'UPDATE {table} SET location_id = ('
+            ' SELECT min(duplicate.id) FROM locations location'
+            ' JOIN locations duplicate'
+            ' ON duplicate.city = location.city AND duplicate.state = location.state'
+            ' WHERE location.id = {table}.location_id)'
+            ' WHERE location_id IN (SELECT id FROM locations'
+            ' WHERE city IS NOT NULL AND state IS NOT NULL)'.format(table=table))
+    op.execute(
+        'DELETE FROM locations WHERE city IS NOT NULL AND state IS NOT NULL'
+        ' AND id NOT IN (SELECT min(id) FROM locations GROUP BY city, state)')
+    with op.batch_alter_table('locations') as batch_op:
+        batch_op.create_unique_constraint('uq_locations_city_state', ['city', 'state'])
+
+
+def downgrade():
+    with op.batch_alter_table('locations') as batch_op:
+        batch_op.drop_constraint('uq_locations_city_state', type_='unique')
+    for index, table, columns in INDEXES:
+        op.drop_index(index, table_name=table)
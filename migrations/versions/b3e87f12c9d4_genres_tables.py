@@ -0,0 +1,94 @@
+"""genres tables
+
+Revision ID: b3e87f12c9d4
+Revises: 5c0d9a6e41b2
+Create Date: 2026-10-18 11:03:27.640915
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3e87f12c9d4'
+down_revision = '5c0d9a6e41b2'
+branch_labels = None
+depends_on = None
+
+# (entity table, genres string column, association table, association key)
+GENRE_COLUMNS = [
+    ('venues', 'venue_genres', 'venues_genres', 'venue_id'),
+    ('artists', 'artist_genres', 'artists_genres', 'artist_id'),
+]
+
+
+def parse_genres(value):
+    # genres were stored as postgres array literals, e.g. '{Jazz,Rock n Roll}'
+    if not value:
+        return []
+    return [genre.strip().strip('"') for genre in value.strip('{}').split(',') if genre.strip()]
+
+
+def upgrade():
+    genres = op.create_table('genres',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    for table, column, association, key in GENRE_COLUMNS:
+        op.create_table(association,
+        sa.Column('genre_id', sa.Integer(), nullable=False),
+        sa.Column(key, sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['genre_id'], ['genres.id'], ),
+        sa.ForeignKeyConstraint([key], [table + '.id'], ),
+        sa.PrimaryKeyConstraint('genre_id', key)
+        )
+        op.create_index('ix_{}_{}'.format(association, key), association, [key])
+
+    # move the genre strings to the association tables
+    connection = op.get_bind()
+    genre_ids = {}
+    for table, column, association, key in GENRE_COLUMNS:
+        links = []
+        rows = connection.execute(sa.text('SELECT id, {} FROM {}'.format(column, table))).fetchall()
+        for entity_id, value in rows:
+            for name in set(parse_genres(value)):
+                if name not in genre_ids:
+                    genre_ids[name] = connection.execute(
+                        genres.insert().values(name=name)).inserted_primary_key[0]
+                links.append({'genre_id': genre_ids[name], key: entity_id})
+        if links:
+            connection.execute(sa.table(association, sa.column('genre_id'), sa.column(key)).insert(), links)
+
+    for table, column, association, key in GENRE_COLUMNS:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_index('ix_{}_{}_trgm'.format(table, column))
+            batch_op.drop_column(column)
+
+
+def downgrade():
+    connection = op.get_bind()
+    for table, column, association, key in GENRE_COLUMNS:
+        op.add_column(table, sa.Column(column, sa.String(length=500), nullable=True))
+        if connection.dialect.name == 'postgresql':
+            op.create_index('ix_{}_{}_trgm'.format(table, column), table, [column],
+                            postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'})
+        else:
+            op.create_index('ix_{}_{}_trgm'.format(table, column), table, [column])
+
+        # rebuild the '{a,b}' genre strings from the association table
+        genres_by_entity = {}
+        rows = connection.execute(sa.text(
+            'SELECT a.{key}, g.name FROM {association} a JOIN genres g ON g.id = a.genre_id '
+            'ORDER BY a.{key}, g.name'.format(key=key, association=association)))
+        for entity_id, name in rows:
+            genres_by_entity.setdefault(entity_id, []).append(name)
+        for entity_id, names in genres_by_entity.items():
+            connection.execute(
+                sa.text('UPDATE {} SET {} = :genres WHERE id = :id'.format(table, column)),
+                {'genres': '{' + ','.join(names) + '}', 'id': entity_id})
+
+        op.drop_index('ix_{}_{}'.format(association, key), table_name=association)
+        op.drop_table(association)
+    op.drop_table('genres')
@@ -0,0 +1,53 @@
+"""show stats tables
+
+Revision ID: c5d2e8f1a374
+Revises: 7a9c3d5e2f16
+Create Date: 2026-10-18 16:05:12.418305
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5d2e8f1a374'
+down_revision = '7a9c3d5e2f16'
+branch_labels = None
+depends_on = None
+
+# (table, key column, referenced table)
+TABLES = [
+    ('venue_show_stats', 'venue_id', 'venues'),
+    ('artist_show_stats', 'artist_id', 'artists'),
+]
+
+
+def upgrade():
+    now = datetime.now()
+    for table, key, parent in TABLES:
+        op.create_table(
+            table,
+            sa.Column(key, sa.Integer(), nullable=False),
+            sa.Column('past_shows_count', sa.Integer(), nullable=False),
+            sa.Column('upcoming_shows_count', sa.Integer(), nullable=False),
+            sa.Column('next_show_date', sa.DateTime(), nullable=True),
+            sa.Column('rolled_at', sa.DateTime(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+            sa.ForeignKeyConstraint([key], ['{}.id'.format(parent)]),
+            sa.PrimaryKeyConstraint(key)
+        )
+        op.create_index('ix_{}_next_show_date'.format(table), table, ['next_show_date'])
+        # count the existing shows, as `flask stats rebuild` does
+        op.execute(sa.text(
+            'INSERT INTO {table} ({key}, past_shows_count, upcoming_shows_count, next_show_date, rolled_at)'
+            ' SELECT {key}, count(CASE WHEN show_date <= :now THEN id END),'
+            ' count(CASE WHEN show_date > :now THEN id END),'
+            ' min(CASE WHEN show_date > :now THEN show_date END), :now'
+            ' FROM shows GROUP BY {key}'.format(table=table, key=key)).bindparams(now=now))
+
+
+def downgrade():
+    for table, key, parent in TABLES:
+        op.drop_index('ix_{}_next_show_date'.format(table), table_name=table)
+        op.drop_table(table)
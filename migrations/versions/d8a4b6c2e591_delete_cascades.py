@@ -0,0 +1,45 @@
+"""delete cascades
+
+Revision ID: d8a4b6c2e591
+Revises: c5d2e8f1a374
+Create Date: 2026-10-18 17:12:37.640218
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8a4b6c2e591'
+down_revision = 'c5d2e8f1a374'
+branch_labels = None
+depends_on = None
+
+# (table, column, referenced table) of the rows going with their venue or artist
+FOREIGN_KEYS = [
+    ('shows', 'venue_id', 'venues'),
+    ('shows', 'artist_id', 'artists'),
+    ('venues_genres', 'venue_id', 'venues'),
+    ('artists_genres', 'artist_id', 'artists'),
+    ('venue_show_stats', 'venue_id', 'venues'),
+    ('artist_show_stats', 'artist_id', 'artists'),
+]
+
+# the foreign keys were created unnamed: postgres named them <table>_<column>_fkey,
+# and batch mode gives the same names to the unnamed ones reflected from sqlite
+NAMING_CONVENTION = {'fk': '%(table_name)s_%(column_0_name)s_fkey'}
+
+
+def set_ondelete(ondelete):
+    for table, column, referred in FOREIGN_KEYS:
+        name = '{}_{}_fkey'.format(table, column)
+        with op.batch_alter_table(table, naming_convention=NAMING_CONVENTION) as batch_op:
+            batch_op.drop_constraint(name, type_='foreignkey')
+            batch_op.create_foreign_key(name, referred, [column], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    set_ondelete('CASCADE')
+
+
+def downgrade():
+    set_ondelete(None)
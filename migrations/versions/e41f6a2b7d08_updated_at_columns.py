@@ -0,0 +1,34 @@
+"""updated_at columns
+
+Revision ID: e41f6a2b7d08
+Revises: b3e87f12c9d4
+Create Date: 2026-10-18 13:48:05.227391
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e41f6a2b7d08'
+down_revision = 'b3e87f12c9d4'
+branch_labels = None
+depends_on = None
+
+TABLES = ['locations', 'venues', 'artists', 'shows']
+
+
+def upgrade():
+    # existing rows are stamped with the migration time; SQLite can't add a
+    # column with a non-constant default to a table, which is recreated instead
+    recreate = 'always' if op.get_bind().dialect.name == 'sqlite' else 'auto'
+    for table in TABLES:
+        with op.batch_alter_table(table, recreate=recreate) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=False,
+                                          server_default=sa.func.now()))
+
+
+def downgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('updated_at')
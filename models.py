@@ -1,5 +1,8 @@
+from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 from flask import Flask
+from sqlalchemy.dialects import postgresql, sqlite
+import replicas
 
 app = Flask(__name__)
 #----------------------------------------------------------------------------#
@@ -7,7 +10,9 @@ app = Flask(__name__)
 #----------------------------------------------------------------------------#
 
 app.config.from_object('config')
-db = SQLAlchemy(app)
+# queries of read-only views may be sent to read replicas, see replicas.py
+db = SQLAlchemy(app, session_options={'class_': replicas.RoutingSession})
+replicas.init_app(app, db)
 
 #----------------------------------------------------------------------------#
 # Models.
@@ -16,6 +21,13 @@ db = SQLAlchemy(app)
 
 class Venue(db.Model):
     __tablename__ = 'venues'
+    # trigram indexes serving partial matches of venue searches on postgres
+    __table_args__ = (
+        db.Index('ix_venues_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}),
+        # venues are listed and joined by location
+        db.Index('ix_venues_location_id', 'location_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
@@ -27,15 +39,26 @@ class Venue(db.Model):
     # TODO: implement any missing fields, as a database migration using Flask-Migrate
     seeking_talents = db.Column(db.Boolean, default=False)
     seeking_description = db.Column(db.String(500))
-    venue_genres = db.Column(db.String(500))
     venue_website = db.Column(db.String(500))
     location_id = db.Column(db.Integer, db.ForeignKey(
         'locations.id'), nullable=True)
-    shows = db.relationship('Show', backref='venue_shows', lazy=True)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow,
+                           onupdate=datetime.utcnow, server_default=db.func.now())
+    # shows, genre links and stats go with their venue, deleted by the database
+    shows = db.relationship('Show', backref='venue_shows', lazy=True, passive_deletes=True)
+    genres = db.relationship('Genre', secondary='venues_genres', lazy=True,
+                             order_by='Genre.name', backref='venues')
 
 
 class Artist(db.Model):
     __tablename__ = 'artists'
+    # trigram indexes serving partial matches of artist searches on postgres
+    __table_args__ = (
+        db.Index('ix_artists_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}),
+        # artists are joined by location
+        db.Index('ix_artists_location_id', 'location_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
@@ -46,34 +69,139 @@ class Artist(db.Model):
     # TODO: implement any missing fields, as a database migration using Flask-Migrate
     seeking_venues = db.Column(db.Boolean, default=False)
     seeking_description = db.Column(db.String(500))
-    artist_genres = db.Column(db.String(500))
     artist_website = db.Column(db.String(500))
     location_id = db.Column(db.Integer, db.ForeignKey(
         'locations.id'), nullable=True)
-    shows = db.relationship('Show', backref='artist_shows', lazy=True)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow,
+                           onupdate=datetime.utcnow, server_default=db.func.now())
+    # shows, genre links and stats go with their artist, deleted by the database
+    shows = db.relationship('Show', backref='artist_shows', lazy=True, passive_deletes=True)
+    genres = db.relationship('Genre', secondary='artists_genres', lazy=True,
+                             order_by='Genre.name', backref='artists')
 
 # TODO Implement Show and Artist models, and complete all model relationships and properties, as a database migration.
 
 
 class Show(db.Model):
     __tablename__ = 'shows'
+    # shows are read per venue or per artist split by date, and listed in
+    # (show_date, id) order by the keyset pagination of /shows
+    __table_args__ = (
+        db.Index('ix_shows_venue_id_show_date', 'venue_id', 'show_date'),
+        db.Index('ix_shows_artist_id_show_date', 'artist_id', 'show_date'),
+        db.Index('ix_shows_show_date_id', 'show_date', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     # show star_time in datetime
     show_date = db.Column(db.DateTime(), nullable=True)
     artist_id = db.Column(db.Integer, db.ForeignKey(
-        'artists.id'), nullable=False)
+        'artists.id', ondelete='CASCADE'), nullable=False)
     venue_id = db.Column(db.Integer, db.ForeignKey(
-        'venues.id'), nullable=False)
+        'venues.id', ondelete='CASCADE'), nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow,
+                           onupdate=datetime.utcnow, server_default=db.func.now())
+
+# Show counts of each venue and artist, kept by stats.py as shows are added and
+# removed so that listings never count shows. Shows dated after rolled_at are
+# upcoming, the others past; `flask stats rollover` moves the shows that passed
+# since, for the rows whose next_show_date is due.
+
+
+class VenueShowStats(db.Model):
+    __tablename__ = 'venue_show_stats'
+    __table_args__ = (
+        db.Index('ix_venue_show_stats_next_show_date', 'next_show_date'),
+    )
+
+    venue_id = db.Column(db.Integer, db.ForeignKey('venues.id', ondelete='CASCADE'), primary_key=True)
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0)
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0)
+    next_show_date = db.Column(db.DateTime)
+    rolled_at = db.Column(db.DateTime, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow,
+                           onupdate=datetime.utcnow, server_default=db.func.now())
+
+
+class ArtistShowStats(db.Model):
+    __tablename__ = 'artist_show_stats'
+    __table_args__ = (
+        db.Index('ix_artist_show_stats_next_show_date', 'next_show_date'),
+    )
+
+    artist_id = db.Column(db.Integer, db.ForeignKey('artists.id', ondelete='CASCADE'), primary_key=True)
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0)
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0)
+    next_show_date = db.Column(db.DateTime)
+    rolled_at = db.Column(db.DateTime, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow,
+                           onupdate=datetime.utcnow, server_default=db.func.now())
 
 # Avoid data duplication in venue and artist relations (3rd nf)
 
 
 class Location(db.Model):
     __tablename__ = 'locations'
+    # trigram index serving partial matches on city names on postgres, and one
+    # location per city and state, looked up through the unique index
+    __table_args__ = (
+        db.Index('ix_locations_city_trgm', 'city', postgresql_using='gin',
+                 postgresql_ops={'city': 'gin_trgm_ops'}),
+        db.UniqueConstraint('city', 'state', name='uq_locations_city_state'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     city = db.Column(db.String(120))
     state = db.Column(db.String(120))
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow,
+                           onupdate=datetime.utcnow, server_default=db.func.now())
     artists = db.relationship('Artist', backref='artist_location', lazy=True)
     venues = db.relationship('Venue', backref='venue_location', lazy=True)
+
+# Genres are shared by venues and artists through association tables, keyed by
+# genre first so that listing the venues or artists of a genre is an index lookup
+
+
+class Genre(db.Model):
+    __tablename__ = 'genres'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False, unique=True)
+
+
+venues_genres = db.Table(
+    'venues_genres',
+    db.Column('genre_id', db.Integer, db.ForeignKey('genres.id'), primary_key=True),
+    db.Column('venue_id', db.Integer, db.ForeignKey('venues.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_venues_genres_venue_id', 'venue_id')
+)
+
+
+artists_genres = db.Table(
+    'artists_genres',
+    db.Column('genre_id', db.Integer, db.ForeignKey('genres.id'), primary_key=True),
+    db.Column('artist_id', db.Integer, db.ForeignKey('artists.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_artists_genres_artist_id', 'artist_id')
+)
+
+# set up the backrefs (Venue.venue_location, Show.artist_shows, ...) right away,
+# code like the searches refers to them before running any query
+db.configure_mappers()
+
+
+#----------------------------------------------------------------------------#
+# Upserts.
+#----------------------------------------------------------------------------#
+
+
+def insert_ignoring_conflicts(model, index_elements):
+    # INSERT into the table of the model skipping the rows that conflict on the
+    # given unique columns, or None on the databases without ON CONFLICT
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        statement = postgresql.insert(model)
+    elif dialect == 'sqlite':
+        statement = sqlite.insert(model)
+    else:
+        return None
+    return statement.on_conflict_do_nothing(index_elements=index_elements)
@@ -0,0 +1,93 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import time
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import delete, select
+from importer import chunked
+from models import db, Venue, Artist, Show, VenueShowStats, ArtistShowStats, venues_genres, artists_genres
+import stats
+
+#----------------------------------------------------------------------------#
+# Bulk deletes.
+#----------------------------------------------------------------------------#
+
+# Venues and artists are deleted with their shows, genre links and show stats in
+# a fixed number of statements, whatever the number of shows: nothing is loaded
+# in the session. The foreign keys cascade on delete, and the relationships use
+# passive_deletes so that the ORM leaves it to the database; the dependent rows
+# are still deleted explicitly since SQLite only enforces foreign keys, and so
+# cascades, on connections asking for it.
+#
+# `flask purge venues|artists ID...` deletes many at once, in batches of ids each
+# in its own transaction.
+
+# entity: (model, its shows column, the other side of its shows, its genre
+# links column, its stats column, its cache tag, the cache tag of the other side)
+ENTITIES = {
+    'venues': (Venue, Show.venue_id, Show.artist_id, venues_genres.c.venue_id, VenueShowStats.venue_id,
+               'venue', 'artist'),
+    'artists': (Artist, Show.artist_id, Show.venue_id, artists_genres.c.artist_id, ArtistShowStats.artist_id,
+                'artist', 'venue'),
+}
+
+
+def delete_entities(entity, ids):
+    # delete the venues or artists of these ids, returns the number deleted and
+    # the cache tags of the pages showing them; the caller commits
+    model, show_key, other_key, genres_key, stats_key, tag, other_tag = ENTITIES[entity]
+    ids = list(ids)
+    others = db.session.execute(select(other_key).where(show_key.in_(ids)).distinct()).scalars().all()
+    # the other side of their shows loses them
+    stats.remove_shows(show_key.in_(ids))
+    for column in (show_key, genres_key, stats_key):
+        db.session.execute(delete(column.table).where(column.in_(ids)))
+    deleted = db.session.execute(delete(model).where(model.id.in_(ids)).
+                                 execution_options(synchronize_session=False)).rowcount
+    # the venues listing shows upcoming counts, changed by deleting artists too
+    tags = {entity, 'shows', 'venues'}
+    tags.update('{}:{}'.format(tag, entity_id) for entity_id in ids)
+    tags.update('{}:{}'.format(other_tag, other_id) for other_id in others)
+    return deleted, tags
+
+
+def delete_venues(ids):
+    return delete_entities('venues', ids)
+
+
+def delete_artists(ids):
+    return delete_entities('artists', ids)
+
+
+@click.command('purge')
+@click.argument('entity', type=click.Choice(list(ENTITIES)))
+@click.argument('ids', nargs=-1, type=int)
+@click.option('--ids-from', type=click.File('r'), help='Read the ids from this file, one per line ("-" for stdin).')
+@click.option('--batch-size', default=1000, show_default=True, help='Ids deleted per transaction.')
+@with_appcontext
+def purge_command(entity, ids, ids_from, batch_size):
+    """Delete venues or artists with their shows, in batches."""
+    if ids_from:
+        ids = list(ids) + [int(line) for line in ids_from if line.strip()]
+    started = time.monotonic()
+    total = 0
+    tags = set()
+    for batch in chunked(ids, batch_size):
+        try:
+            deleted, batch_tags = delete_entities(entity, batch)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        total += deleted
+        tags |= batch_tags
+        click.echo('{} {} deleted'.format(total, entity))
+
+    # only reaches the web workers with a shared cache backend
+    page_cache = current_app.extensions.get('page_cache')
+    if page_cache is not None and total:
+        page_cache.invalidate(*tags)
+    click.echo('Done in {:.1f}s: {} {} deleted.'.format(time.monotonic() - started, total, entity))
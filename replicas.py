@@ -0,0 +1,79 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import inspect
+import random
+import time
+from functools import wraps
+from flask import current_app, g, has_request_context, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql.dml import UpdateBase
+
+#----------------------------------------------------------------------------#
+# Read replicas.
+#----------------------------------------------------------------------------#
+
+# Replicas are the SQLALCHEMY_BINDS named replica<n>. Views marked read_only send
+# their queries to one of them, picked per request, everything else goes to the
+# primary. A client that committed something within the last REPLICA_LAG_WINDOW
+# seconds reads from the primary, so that it sees its own writes even when the
+# replicas lag behind.
+
+REPLICA_PREFIX = 'replica'
+
+
+class RoutingSession(Session):
+    # Session binding queries to the replica picked for the request, if any
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        replica = g.get('replica') if has_request_context() else None
+        if bind is None and replica is not None and not self._flushing and \
+                not isinstance(clause, UpdateBase):
+            return self._db.engines[replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def replica_keys():
+    return [key for key in current_app.config.get('SQLALCHEMY_BINDS') or {}
+            if key.startswith(REPLICA_PREFIX)]
+
+
+def use_replica():
+    # route the reads of the current request to a replica, unless the client
+    # has just written to the primary
+    keys = replica_keys()
+    last_write = session.get('last_write')
+    if keys and not (last_write and time.time() - last_write < current_app.config['REPLICA_LAG_WINDOW']):
+        g.replica = random.choice(keys)
+
+
+def read_only(view):
+    # views only reading from the database, which replicas can serve
+    if inspect.iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            use_replica()
+            return await view(*args, **kwargs)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        use_replica()
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def init_app(app, db):
+    @event.listens_for(db.session, 'after_commit')
+    def remember_write(db_session):
+        # only commits made while serving a client are followed by its reads
+        if has_request_context():
+            g.wrote = True
+
+    @app.after_request
+    def record_write(response):
+        if g.get('wrote'):
+            session['last_write'] = time.time()
+        return response
@@ -0,0 +1,230 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+from collections import defaultdict
+from sqlalchemy import func, or_, select, union
+from models import db, Venue, Artist, Show, Location, Genre, venues_genres, artists_genres
+
+#----------------------------------------------------------------------------#
+# Search.
+#----------------------------------------------------------------------------#
+
+# Venues and artists are matched on their name, city, state and genres.
+# On PostgreSQL, partial matches are ILIKE '%term%' filters served by the pg_trgm
+# GIN indexes of the search migration, and results are ranked with word_similarity.
+# Other databases (SQLite in tests) have no trigram support, so they fall back
+# to an in-memory trigram index built from the same fields.
+
+
+def like_pattern(term):
+    # '%term%' pattern for a case-insensitive partial match, with LIKE wildcards escaped
+    term = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return '%{}%'.format(term)
+
+
+def name_matches(column, term):
+    # partial, case-insensitive match on a name column (trigram indexed on postgres)
+    return column.ilike(like_pattern(term), escape='\\')
+
+
+def trigrams(text):
+    # trigrams of a lowercased text, padded the same way pg_trgm pads words
+    trigram_set = set()
+    for word in text.lower().split():
+        word = '  {} '.format(word)
+        for i in range(len(word) - 2):
+            trigram_set.add(word[i:i + 3])
+    return trigram_set
+
+
+def similarity(term_trigrams, text_trigrams):
+    # share of the term trigrams found in the text, like pg_trgm word_similarity
+    if not term_trigrams:
+        return 0.0
+    return len(term_trigrams & text_trigrams) / len(term_trigrams)
+
+
+class TrigramIndex:
+    # In-memory inverted index from trigrams to document ids
+
+    def __init__(self):
+        self.postings = defaultdict(set)
+        self.documents = {}
+
+    def add(self, doc_id, *fields):
+        fields = [field.lower() for field in fields if field]
+        document_trigrams = set()
+        for field in fields:
+            document_trigrams |= trigrams(field)
+        for trigram in document_trigrams:
+            self.postings[trigram].add(doc_id)
+        self.documents[doc_id] = (fields, document_trigrams)
+
+    def search(self, term):
+        # ids of the documents containing the term, best matches first
+        term = term.lower().strip()
+        term_trigrams = trigrams(term)
+        # a substring match needs all the inner trigrams of the term, the padded
+        # ones only exist if the term starts or ends on a word boundary
+        inner_trigrams = [t for t in term_trigrams if ' ' not in t]
+        if inner_trigrams:
+            candidates = set.intersection(*(self.postings.get(t, set()) for t in inner_trigrams))
+        else:
+            candidates = self.documents.keys()
+
+        results = []
+        for doc_id in candidates:
+            fields, document_trigrams = self.documents[doc_id]
+            if any(term in field for field in fields):
+                results.append((similarity(term_trigrams, document_trigrams), doc_id))
+        results.sort(key=lambda result: (-result[0], result[1]))
+        return [doc_id for score, doc_id in results]
+
+
+# fallback indexes, built lazily and dropped whenever their table is written to
+indexes = {}
+
+
+def invalidate(table):
+    indexes.pop(table, None)
+
+
+def uses_trigram_indexes():
+    return db.engine.dialect.name == 'postgresql'
+
+
+def build_index(session, model, location_relationship):
+    index = TrigramIndex()
+    genres = defaultdict(list)
+    for entity_id, name in session.execute(select(model.id, Genre.name).join(model.genres)):
+        genres[entity_id].append(name)
+    rows = session.execute(select(model.id, model.name, Location.city, Location.state).
+                           outerjoin(location_relationship))
+    for row in rows:
+        index.add(row.id, row.name, row.city, row.state, *genres[row.id])
+    return index
+
+
+def indexed_ids(session, model, location_relationship, term):
+    # ids of the entities matching the term in the fallback index, best matches first
+    table = model.__tablename__
+    if table not in indexes:
+        indexes[table] = build_index(session, model, location_relationship)
+    return indexes[table].search(term)
+
+
+# the genre links column of each searchable model
+GENRE_LINKS = {
+    Venue: venues_genres.c.venue_id,
+    Artist: artists_genres.c.artist_id
+}
+
+
+def matching_ids(model, term):
+    # SELECT of the ids of the entities matching the term on postgres. Each
+    # field is matched in its own branch of a UNION, served by its own index:
+    # an OR across the outer join to locations could use none of them.
+    link_key = GENRE_LINKS[model]
+    locations = select(Location.id).where(or_(
+        name_matches(Location.city, term),
+        func.upper(Location.state) == term.upper()
+    ))
+    return union(
+        select(model.id).where(name_matches(model.name, term)),
+        select(model.id).where(model.location_id.in_(locations)),
+        select(link_key).join(Genre, Genre.id == link_key.table.c.genre_id).where(name_matches(Genre.name, term))
+    )
+
+
+def entities_statement(model, location_relationship, term, genre=None, columns=None):
+    # SELECT of the entities (or of some of their columns) matching the term on
+    # postgres, best matches first; locations are only joined to rank them
+    rank = func.greatest(
+        func.word_similarity(term, model.name),
+        func.word_similarity(term, func.coalesce(Location.city, ''))
+    )
+    statement = select(*(columns or [model])).outerjoin(location_relationship).\
+        where(model.id.in_(matching_ids(model, term)))
+    if genre:
+        statement = statement.where(model.genres.any(Genre.name == genre))
+    return statement.order_by(rank.desc(), model.id)
+
+
+def indexed_statement(model, ids, genre=None, columns=None):
+    # SELECT of the entities (or of some of their columns) found in the fallback index
+    statement = select(*(columns or [model])).where(model.id.in_(ids))
+    if genre:
+        statement = statement.where(model.genres.any(Genre.name == genre))
+    return statement
+
+
+def in_index_order(ids, entities):
+    entities = {entity.id: entity for entity in entities}
+    return [entities[entity_id] for entity_id in ids if entity_id in entities]
+
+
+def search_entities(model, location_relationship, term, genre=None):
+    if uses_trigram_indexes():
+        return db.session.execute(entities_statement(model, location_relationship, term, genre)).scalars().all()
+
+    ids = indexed_ids(db.session, model, location_relationship, term)
+    entities = db.session.execute(indexed_statement(model, ids, genre)).scalars()
+    return in_index_order(ids, entities)
+
+
+def search_venues(term, genre=None):
+    # venues matching the search term, best matches first, optionally of one genre only
+    return search_entities(Venue, Venue.venue_location, term, genre)
+
+
+def search_artists(term, genre=None):
+    # artists matching the search term, best matches first, optionally of one genre only
+    return search_entities(Artist, Artist.artist_location, term, genre)
+
+
+def matching_shows(statement, term):
+    # shows of the artists or venues whose name matches the term, each side
+    # matched in its own subquery on its name index; a show matching on both is
+    # still one row
+    return statement.where(or_(
+        Show.artist_id.in_(select(Artist.id).where(name_matches(Artist.name, term))),
+        Show.venue_id.in_(select(Venue.id).where(name_matches(Venue.name, term)))
+    ))
+
+
+def shows_statement(term, limit=None, offset=0):
+    # the total comes from a window count in the same query; artists and venues
+    # are only joined for their names
+    return matching_shows(select(
+        Show.id, Show.show_date, Show.artist_id, Artist.name.label('artist_name'),
+        Show.venue_id, Venue.name.label('venue_name'), func.count().over().label('total')
+    ).join(Artist, Show.artist_id == Artist.id).join(Venue, Show.venue_id == Venue.id), term).\
+        order_by(Show.show_date, Show.id).limit(limit).offset(offset)
+
+
+def shows_count_statement(term):
+    return matching_shows(select(func.count(Show.id)), term)
+
+
+def show_results(rows):
+    # (total count, shows) of the rows of shows_statement
+    count = rows[0].total if rows else 0
+    shows = [{
+        "id": row.id,
+        "artist_id": row.artist_id,
+        "artist_name": row.artist_name,
+        "venue_id": row.venue_id,
+        "venue_name": row.venue_name,
+        "start_time": row.show_date.isoformat() if row.show_date else ''
+    } for row in rows]
+    return count, shows
+
+
+def search_shows(term, limit=None, offset=0):
+    # (total count, one page of shows) whose artist or venue name matches the term
+    count, shows = show_results(db.session.execute(shows_statement(term, limit, offset)).all())
+    if not shows and offset:
+        # a page past the end has no row to carry the window count
+        count = db.session.execute(shows_count_statement(term)).scalar()
+    return count, shows
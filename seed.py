@@ -0,0 +1,140 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import random
+import time
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import func, insert, select
+from forms import VenueForm
+from importer import chunked, genre_ids
+from locations import resolve_locations
+from models import db, Venue, Artist, Show, venues_genres, artists_genres
+import stats
+
+#----------------------------------------------------------------------------#
+# Synthetic data.
+#----------------------------------------------------------------------------#
+
+# `flask seed` adds a reproducible synthetic catalog, for development and for
+# the benchmarks. Like real listings, it is skewed: a few cities hold most of
+# the venues and artists, and a few venues and artists get most of the shows
+# (Zipf-like weights). Shows spread over the past and the coming year, in the
+# evening.
+
+CITIES = [
+    ('New York', 'NY'), ('Los Angeles', 'CA'), ('Chicago', 'IL'), ('Houston', 'TX'),
+    ('Phoenix', 'AZ'), ('Philadelphia', 'PA'), ('San Antonio', 'TX'), ('San Diego', 'CA'),
+    ('Dallas', 'TX'), ('San Francisco', 'CA'), ('Austin', 'TX'), ('Seattle', 'WA'),
+    ('Denver', 'CO'), ('Nashville', 'TN'), ('Boston', 'MA'), ('Portland', 'OR'),
+    ('Las Vegas', 'NV'), ('Detroit', 'MI'), ('Memphis', 'TN'), ('New Orleans', 'LA'),
+    ('Atlanta', 'GA'), ('Miami', 'FL'), ('Minneapolis', 'MN'), ('Kansas City', 'MO')
+]
+NAME_WORDS = ['Blue', 'Velvet', 'Electric', 'Golden', 'Midnight', 'Silver', 'Red', 'Wild',
+              'Lucky', 'Crystal', 'Rusty', 'Neon', 'Black', 'Sonic', 'Paper', 'Iron']
+VENUE_KINDS = ['Hall', 'Lounge', 'Club', 'Theater', 'Room', 'Bar', 'Ballroom', 'Garden']
+ARTIST_KINDS = ['Band', 'Collective', 'Trio', 'Quartet', 'Orchestra', 'Project', 'Brothers']
+GENRES = [value for value, label in VenueForm.genres.kwargs['choices']]
+STATES = [value for value, label in VenueForm.state.kwargs['choices']]
+
+CHUNK_SIZE = 5000
+
+
+def zipf_weights(count, exponent=1.1):
+    return [1 / (rank ** exponent) for rank in range(1, count + 1)]
+
+
+def location_pairs(rng, count):
+    # real cities first, then made up towns
+    pairs = CITIES[:count]
+    while len(pairs) < count:
+        pairs.append(('{} {}'.format(rng.choice(NAME_WORDS), len(pairs)), rng.choice(STATES)))
+    return pairs
+
+
+def fake_name(rng, kinds, index):
+    return '{} {} {} {}'.format(rng.choice(NAME_WORDS), rng.choice(NAME_WORDS), rng.choice(kinds), index)
+
+
+def fake_phone(rng):
+    return '+1-{}-{}-{:04d}'.format(rng.randint(200, 999), rng.randint(200, 999), rng.randint(0, 9999))
+
+
+def insert_entities(rng, model, links_table, link_column, rows):
+    # insert the rows, then give each new entity one to three genres
+    last_id = db.session.execute(select(func.max(model.id))).scalar() or 0
+    for chunk in chunked(rows, CHUNK_SIZE):
+        db.session.execute(insert(model), chunk)
+    new_ids = db.session.execute(select(model.id).where(model.id > last_id).order_by(model.id)).scalars().all()
+    ids_by_genre = genre_ids(GENRES)
+    genre_weights = zipf_weights(len(GENRES), 0.8)
+    links = ({'genre_id': ids_by_genre[genre], link_column: entity_id}
+             for entity_id in new_ids
+             for genre in set(rng.choices(GENRES, genre_weights, k=rng.randint(1, 3))))
+    for chunk in chunked(links, CHUNK_SIZE):
+        db.session.execute(insert(links_table), chunk)
+    return new_ids
+
+
+def generate(locations, venues, artists, shows, seed=0):
+    # add a synthetic catalog, the same for the same arguments, in one transaction
+    rng = random.Random(seed)
+    pairs = location_pairs(rng, locations)
+    location_ids = resolve_locations(pairs)
+    cities = [location_ids[pair] for pair in pairs]
+    city_weights = zipf_weights(len(cities))
+
+    venue_rows = [{
+        'name': fake_name(rng, VENUE_KINDS, i), 'address': '{} Main Street'.format(rng.randint(1, 9999)),
+        'location_id': rng.choices(cities, city_weights)[0], 'phone': fake_phone(rng),
+        'image_link': 'https://picsum.photos/seed/venue{}/300/300'.format(i),
+        'facebook_link': 'https://www.facebook.com/venue{}'.format(i),
+        'venue_website': 'https://venue{}.example.com'.format(i),
+        'seeking_talents': rng.random() < 0.3, 'seeking_description': None
+    } for i in range(venues)]
+    venue_ids = insert_entities(rng, Venue, venues_genres, 'venue_id', venue_rows)
+
+    artist_rows = [{
+        'name': fake_name(rng, ARTIST_KINDS, i), 'location_id': rng.choices(cities, city_weights)[0],
+        'phone': fake_phone(rng), 'image_link': 'https://picsum.photos/seed/artist{}/300/300'.format(i),
+        'facebook_link': 'https://www.facebook.com/artist{}'.format(i),
+        'artist_website': 'https://artist{}.example.com'.format(i),
+        'seeking_venues': rng.random() < 0.3, 'seeking_description': None
+    } for i in range(artists)]
+    artist_ids = insert_entities(rng, Artist, artists_genres, 'artist_id', artist_rows)
+
+    if venue_ids and artist_ids:
+        # popular venues and artists get most of the shows, one year either side of today
+        venue_weights = zipf_weights(len(venue_ids))
+        artist_weights = zipf_weights(len(artist_ids))
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        show_rows = ({
+            'venue_id': rng.choices(venue_ids, venue_weights)[0],
+            'artist_id': rng.choices(artist_ids, artist_weights)[0],
+            'show_date': today + timedelta(days=rng.randint(-365, 365), hours=rng.choice([19, 20, 21, 22]))
+        } for _ in range(shows))
+        for chunk in chunked(show_rows, CHUNK_SIZE):
+            db.session.execute(insert(Show), chunk)
+        stats.refresh(venue_ids, artist_ids)
+    db.session.commit()
+
+
+@click.command('seed')
+@click.option('--locations', default=20, show_default=True)
+@click.option('--venues', default=200, show_default=True)
+@click.option('--artists', default=400, show_default=True)
+@click.option('--shows', default=5000, show_default=True)
+@click.option('--seed', default=0, show_default=True, help='Random seed, the same seed adds the same data.')
+@with_appcontext
+def seed_command(locations, venues, artists, shows, seed):
+    """Add synthetic locations, venues, artists and shows."""
+    started = time.monotonic()
+    generate(locations, venues, artists, shows, seed)
+    page_cache = current_app.extensions.get('page_cache')
+    if page_cache is not None:
+        page_cache.invalidate('venues', 'artists', 'shows')
+    click.echo('Seeded {} locations, {} venues, {} artists and {} shows in {:.1f}s.'.format(
+        locations, venues, artists, shows, time.monotonic() - started))
@@ -0,0 +1,158 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import time
+from datetime import datetime
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import and_, case, delete, func, insert, literal, not_, or_, select, update
+from models import db, Show, VenueShowStats, ArtistShowStats, insert_ignoring_conflicts
+
+#----------------------------------------------------------------------------#
+# Show statistics.
+#----------------------------------------------------------------------------#
+
+# The past and upcoming show counts and the next show date of every venue and
+# artist live in venue_show_stats and artist_show_stats, so that listings read
+# them without counting shows. A row counts the shows dated after its rolled_at
+# as upcoming and the others as past; a venue or an artist without a row has no
+# shows.
+#
+# Writes keep them current with a fixed number of statements, whatever the
+# number of shows: add_shows() after inserting shows, remove_shows() before
+# deleting them, refresh() recounting given venues and artists after bulk
+# inserts. `flask stats rollover`, run periodically (e.g. every few minutes from
+# cron), moves the shows that passed from upcoming to past, only touching the
+# rows whose next show is due; `flask stats rebuild` recounts everything.
+
+# (stats model, its key column, the matching column of shows)
+STATS = [
+    (VenueShowStats, VenueShowStats.venue_id, Show.venue_id),
+    (ArtistShowStats, ArtistShowStats.artist_id, Show.artist_id)
+]
+
+IDS_PER_STATEMENT = 5000
+
+
+def add_shows(condition, now=None):
+    # count the shows matching the condition, just inserted in this transaction
+    now = now or datetime.now()
+    for model, key, show_key in STATS:
+        # venues and artists getting their first shows start with empty counts;
+        # concurrent first shows of the same one may both try to insert its row
+        statement = insert_ignoring_conflicts(model, [key])
+        if statement is None:
+            statement = insert(model)
+        db.session.execute(statement.from_select(
+            [key.name, 'past_shows_count', 'upcoming_shows_count', 'rolled_at'],
+            select(show_key, literal(0), literal(0), literal(now)).
+            where(condition, show_key.not_in(select(key))).distinct()))
+
+        shows = and_(condition, show_key == key)
+        upcoming = select(func.count(Show.id)).where(shows, Show.show_date > model.rolled_at).scalar_subquery()
+        past = select(func.count(Show.id)).where(shows, Show.show_date <= model.rolled_at).scalar_subquery()
+        first = select(func.min(Show.show_date)).where(shows, Show.show_date > model.rolled_at).scalar_subquery()
+        db.session.execute(update(model).where(key.in_(select(show_key).where(condition))).values(
+            upcoming_shows_count=model.upcoming_shows_count + upcoming,
+            past_shows_count=model.past_shows_count + past,
+            next_show_date=case(
+                (and_(first.isnot(None), or_(model.next_show_date.is_(None), first < model.next_show_date)), first),
+                else_=model.next_show_date)
+        ))
+
+
+def remove_shows(condition):
+    # uncount the shows matching the condition, about to be deleted
+    for model, key, show_key in STATS:
+        shows = and_(condition, show_key == key)
+        upcoming = select(func.count(Show.id)).where(shows, Show.show_date > model.rolled_at).scalar_subquery()
+        past = select(func.count(Show.id)).where(shows, Show.show_date <= model.rolled_at).scalar_subquery()
+        # the next of the shows that stay
+        first = select(func.min(Show.show_date)).\
+            where(show_key == key, not_(condition), Show.show_date > model.rolled_at).scalar_subquery()
+        db.session.execute(update(model).where(key.in_(select(show_key).where(condition))).values(
+            upcoming_shows_count=model.upcoming_shows_count - upcoming,
+            past_shows_count=model.past_shows_count - past,
+            next_show_date=first
+        ))
+
+
+def refresh(venue_ids=None, artist_ids=None, now=None):
+    # recount the given venues and artists from their shows, or all of them
+    # when no ids are given at all
+    now = now or datetime.now()
+    everything = venue_ids is None and artist_ids is None
+    for (model, key, show_key), ids in zip(STATS, (venue_ids, artist_ids)):
+        if everything:
+            batches = [None]
+        else:
+            ids = sorted(ids or ())
+            batches = [ids[i:i + IDS_PER_STATEMENT] for i in range(0, len(ids), IDS_PER_STATEMENT)]
+        for batch in batches:
+            counts = select(
+                show_key,
+                func.count(case((Show.show_date <= now, Show.id))),
+                func.count(case((Show.show_date > now, Show.id))),
+                func.min(case((Show.show_date > now, Show.show_date))),
+                literal(now)
+            ).group_by(show_key)
+            clear = delete(model)
+            if batch is not None:
+                counts = counts.where(show_key.in_(batch))
+                clear = clear.where(key.in_(batch))
+            db.session.execute(clear)
+            db.session.execute(insert(model).from_select(
+                [key.name, 'past_shows_count', 'upcoming_shows_count', 'next_show_date', 'rolled_at'], counts))
+
+
+def rollover(now=None):
+    # move the shows that passed since each row was rolled to the past, returns
+    # the number of rows updated
+    now = now or datetime.now()
+    rolled = 0
+    for model, key, show_key in STATS:
+        passed = select(func.count(Show.id)).where(
+            show_key == key, Show.show_date > model.rolled_at, Show.show_date <= now).scalar_subquery()
+        first = select(func.min(Show.show_date)).where(show_key == key, Show.show_date > now).scalar_subquery()
+        result = db.session.execute(update(model).where(model.next_show_date <= now).values(
+            past_shows_count=model.past_shows_count + passed,
+            upcoming_shows_count=model.upcoming_shows_count - passed,
+            next_show_date=first,
+            rolled_at=now
+        ))
+        rolled += result.rowcount
+    return rolled
+
+
+@click.group('stats')
+def stats_command():
+    """Maintain the show counts of venues and artists."""
+
+
+@stats_command.command('rollover')
+@with_appcontext
+def rollover_command():
+    """Move the shows that passed from upcoming to past."""
+    started = time.monotonic()
+    rolled = rollover()
+    db.session.commit()
+    if rolled:
+        page_cache = current_app.extensions.get('page_cache')
+        if page_cache is not None:
+            page_cache.invalidate('venues')
+    click.echo('Rolled {} venues and artists over in {:.2f}s.'.format(rolled, time.monotonic() - started))
+
+
+@stats_command.command('rebuild')
+@with_appcontext
+def rebuild_command():
+    """Recount the shows of every venue and artist."""
+    started = time.monotonic()
+    refresh()
+    db.session.commit()
+    page_cache = current_app.extensions.get('page_cache')
+    if page_cache is not None:
+        page_cache.invalidate('venues')
+    click.echo('Rebuilt the show counts in {:.2f}s.'.format(time.monotonic() - started))
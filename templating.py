@@ -0,0 +1,76 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import hashlib
+import os
+from flask import current_app
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+from cache import LRUBackend
+
+#----------------------------------------------------------------------------#
+# Template caching.
+#----------------------------------------------------------------------------#
+
+# Compiled templates are kept in a bytecode cache on disk, shared by the workers
+# of a host and surviving restarts, so only the first process compiles them.
+#
+# Fragments of pages are cached with {% cache key, ttl %}...{% endcache %}, the
+# key holding the id and updated_at of everything the fragment shows, e.g.
+#   {% cache ('venue-show', show.id, show.updated_at, show.artist_updated_at) %}
+# Such keys change whenever the fragment would, so fragments are never
+# invalidated and are kept in a per-process LRU, without network round trips.
+
+DEFAULT_FRAGMENT_TTL = 3600
+
+
+class FragmentCacheExtension(Extension):
+    # {% cache key[, ttl] %} tag, caching the rendered body under the key
+
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        if parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        else:
+            args.append(nodes.Const(None))
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        return nodes.CallBlock(self.call_method('_cache_fragment', args), [], [], body).set_lineno(lineno)
+
+    def _cache_fragment(self, key, ttl, caller):
+        fragments = self.environment.fragment_cache
+        if fragments is None or not current_app.config.get('FRAGMENT_CACHE', True):
+            return caller()
+        name = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        fragment = fragments.get(name)
+        if fragment is None:
+            fragment = caller()
+            fragments.set(name, fragment, ttl or DEFAULT_FRAGMENT_TTL)
+        return Markup(fragment)
+
+
+def init_app(app):
+    directory = app.config.get('JINJA_CACHE_DIR')
+    if directory:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+    else:
+        # jinja's default directory is private to the user: created 0700 and
+        # checked for ownership, so no other local user can plant bytecode
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache()
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    app.jinja_env.fragment_cache = LRUBackend(app.config.get('FRAGMENT_CACHE_MAX_ENTRIES', 10000))
+
+
+def precompile_templates(app):
+    # load every template once, filling the bytecode cache and the loaded templates
+    for name in app.jinja_env.list_templates(extensions=['html']):
+        app.jinja_env.get_template(name)
@@ -0,0 +1,70 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import os
+import sys
+import tempfile
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The app is configured from the environment when models.py is imported, so the
+# throwaway SQLite database is set before any test imports it. Tests run from a
+# scratch directory, keeping error.log out of the tree.
+DATABASE = tempfile.NamedTemporaryFile(prefix='fyyur-test-', suffix='.db', delete=False).name
+os.environ.update(DATABASE_URL='sqlite:///' + DATABASE, CACHE_TYPE='null', SERVER_TIMING='false')
+os.environ.setdefault('SECRET_KEY', 'test')
+sys.path.insert(0, ROOT)
+os.chdir(tempfile.mkdtemp(prefix='fyyur-test-'))
+
+#----------------------------------------------------------------------------#
+# Fixtures.
+#----------------------------------------------------------------------------#
+
+# data at scale 1 of the synthetic catalog of `flask seed`, multiplied by the scale
+BASE_SIZES = {'locations': 10, 'venues': 50, 'artists': 100, 'shows': 1000}
+
+
+def fresh_database(app, scale=None):
+    # an empty schema, or a synthetic catalog at the given scale, dropping the
+    # per-process caches of the previous data
+    import locations
+    import search
+    from models import db
+    from seed import generate
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        if scale:
+            generate(seed=scale, **{name: size * scale for name, size in BASE_SIZES.items()})
+    locations.location_ids.clear()
+    locations.warmed = False
+    search.indexes.clear()
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import app
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    yield app
+    os.remove(DATABASE)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def statements():
+    # SQL statements run while the test runs
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+    event.listen(Engine, 'before_cursor_execute', record)
+    yield executed
+    event.remove(Engine, 'before_cursor_execute', record)
@@ -0,0 +1,51 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import gzip
+import json
+import os
+import shutil
+import pytest
+from conftest import ROOT
+
+#----------------------------------------------------------------------------#
+# Static assets.
+#----------------------------------------------------------------------------#
+
+# Every worker may build the assets at once: a file only appears under its final
+# name once complete, and a failed build leaves nothing behind.
+
+
+@pytest.fixture
+def static_folder(app, tmp_path, monkeypatch):
+    # a copy of the sources, built apart from the tree
+    folder = str(tmp_path / 'static')
+    shutil.copytree(os.path.join(ROOT, 'static'), folder, ignore=shutil.ignore_patterns('dist'))
+    monkeypatch.setattr(app, 'static_folder', folder)
+    monkeypatch.delitem(app.extensions, 'assets', raising=False)
+    return folder
+
+
+def test_build_writes_complete_files(app, static_folder):
+    import assets
+    manifest = assets.build(app)
+    directory = os.path.join(static_folder, assets.DIST)
+    assert not [name for name in os.listdir(directory) if name.startswith(assets.TEMPORARY_PREFIX)]
+    with open(os.path.join(directory, assets.MANIFEST)) as f:
+        assert json.load(f) == manifest
+    for filename in manifest.values():
+        with open(os.path.join(directory, filename), 'rb') as f, \
+                gzip.open(os.path.join(directory, filename + '.gz')) as compressed:
+            assert f.read() == compressed.read()
+
+
+def test_failed_build_leaves_no_file(app, static_folder, monkeypatch):
+    import assets
+
+    def fail(source, destination):
+        raise OSError('disk full')
+    monkeypatch.setattr(assets.os, 'replace', fail)
+    with pytest.raises(OSError):
+        assets.build(app)
+    assert os.listdir(os.path.join(static_folder, assets.DIST)) == []
@@ -0,0 +1,77 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+from datetime import datetime
+import pytest
+from cache import LRUBackend
+from conftest import fresh_database
+
+#----------------------------------------------------------------------------#
+# Page cache.
+#----------------------------------------------------------------------------#
+
+
+@pytest.fixture
+def page_cache(app):
+    # the in-process backend of a single worker, the tests run without a cache
+    cache = app.extensions['page_cache']
+    cache.backend = LRUBackend()
+    yield cache
+    cache.backend = None
+
+
+def test_write_missed_by_the_worker_is_not_served(app, client, page_cache):
+    from models import db, Venue
+    fresh_database(app, scale=1)
+    first = client.get('/venues/1')
+    assert client.get('/venues/1').headers['X-Cache'] == 'HIT'
+
+    # written by another worker: this one's cache is never invalidated
+    with app.app_context():
+        venue = db.session.get(Venue, 1)
+        venue.name = 'Renamed By Another Worker'
+        venue.updated_at = datetime.utcnow()
+        db.session.commit()
+
+    response = client.get('/venues/1', headers={'If-None-Match': first.headers['ETag']})
+    assert response.status_code == 200
+    assert response.headers['X-Cache'] == 'MISS'
+    assert 'Renamed By Another Worker' in response.get_data(as_text=True)
+    revalidated = client.get('/venues/1', headers={'If-None-Match': response.headers['ETag']})
+    assert revalidated.status_code == 304
+
+
+def test_page_invalidated_while_rendering_is_not_served():
+    from flask import Flask, stream_with_context
+    from cache import PageCache
+    app = Flask(__name__)
+    app.config.update(SECRET_KEY='test', CACHE_TYPE='lru')
+    cache = PageCache(app)
+    data = {'name': 'old'}
+
+    @app.route('/page')
+    @cache.cached('page')
+    def page():
+        body = data['name']
+        # a write lands while the page renders
+        data['name'] = 'new'
+        cache.invalidate('page')
+        return body
+
+    @app.route('/stream')
+    @cache.cached('stream')
+    def stream():
+        def chunks():
+            yield data['name']
+            data['name'] = 'new'
+            cache.invalidate('stream')
+        return app.response_class(stream_with_context(chunks()))
+
+    client = app.test_client()
+    for url in ('/page', '/stream'):
+        data['name'] = 'old'
+        assert client.get(url).get_data(as_text=True) == 'old'
+        response = client.get(url)
+        assert response.headers['X-Cache'] == 'MISS'
+        assert response.get_data(as_text=True) == 'new'
@@ -0,0 +1,43 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import gzip
+import pytest
+from flask import Flask
+from compression import Compression
+
+#----------------------------------------------------------------------------#
+# Response compression.
+#----------------------------------------------------------------------------#
+
+PAGE = b'<p>' + b'Fyyur ' * 200 + b'</p>'
+
+
+def legacy_app(environ, start_response):
+    # a WSGI application writing its body through write()
+    write = start_response('200 OK', [('Content-Type', 'text/html; charset=utf-8')])
+    write(PAGE[:100])
+    write(PAGE[100:])
+    return [b'<!-- end -->']
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.config.update(COMPRESS_MIN_SIZE=500, COMPRESS_LEVELS={'text/html': {'gzip': 6, 'br': 5}})
+    app.wsgi_app = legacy_app
+    Compression(app)
+    return app.test_client()
+
+
+def test_written_body_is_compressed(client):
+    response = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.get_data()) == PAGE + b'<!-- end -->'
+
+
+def test_written_body_passes_through_uncompressed(client):
+    response = client.get('/', headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_data() == PAGE + b'<!-- end -->'
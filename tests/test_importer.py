@@ -0,0 +1,29 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import pytest
+from importer import validate_rows
+
+#----------------------------------------------------------------------------#
+# Bulk import.
+#----------------------------------------------------------------------------#
+
+
+@pytest.mark.parametrize('row', [
+    {'venue_id': '1', 'artist_id': '1'},
+    {'venue_id': '1', 'artist_id': '1', 'start_time': ''},
+])
+def test_show_row_without_start_time_is_rejected(app, row):
+    with app.test_request_context():
+        [(line_number, rejected, errors)] = validate_rows('shows', [(2, row)])
+    assert rejected == row
+    assert errors == {'start_time': ['This field is required.']}
+
+
+def test_show_row_with_start_time_is_valid(app):
+    row = {'venue_id': '1', 'artist_id': '1', 'start_time': '2030-01-01 20:00:00'}
+    with app.test_request_context():
+        [(line_number, form, errors)] = validate_rows('shows', [(2, row)])
+    assert errors is None
+    assert form.start_time.data.year == 2030
@@ -0,0 +1,77 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import os
+import subprocess
+import sys
+import pytest
+from sqlalchemy import create_engine, inspect, select
+from conftest import ROOT
+
+#----------------------------------------------------------------------------#
+# Index usage.
+#----------------------------------------------------------------------------#
+
+# The migrations index the filters and joins of the controllers: the plans of
+# their queries on a migrated SQLite database must use those indexes.
+
+
+@pytest.fixture(scope='module')
+def engine(tmp_path_factory):
+    # a database built by the migrations, not by create_all()
+    directory = tmp_path_factory.mktemp('migrated')
+    database = str(directory / 'migrated.db')
+    environ = dict(os.environ, DATABASE_URL='sqlite:///' + database, PYTHONPATH=ROOT)
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'db', 'upgrade',
+                    '--directory', os.path.join(ROOT, 'migrations')],
+                   check=True, cwd=str(directory), env=environ, stdout=subprocess.DEVNULL)
+    engine = create_engine('sqlite:///' + database)
+    yield engine
+    engine.dispose()
+
+
+def plan(engine, query):
+    # the details of the EXPLAIN QUERY PLAN rows of a query
+    sql = str(query.compile(engine, compile_kwargs={'literal_binds': True}))
+    with engine.connect() as connection:
+        return ' | '.join(row[3] for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql))
+
+
+def unique_constraint_index(engine, table, name):
+    # SQLite backs a unique constraint with an automatic index of its own name
+    columns = next(constraint['column_names'] for constraint in inspect(engine).get_unique_constraints(table)
+                   if constraint['name'] == name)
+    with engine.connect() as connection:
+        for row in connection.exec_driver_sql('PRAGMA index_list({})'.format(table)):
+            index, origin = row[1], row[3]
+            indexed = [info[2] for info in connection.exec_driver_sql('PRAGMA index_info({})'.format(index))]
+            if origin == 'u' and indexed == columns:
+                return index
+
+
+def test_venue_shows_use_venue_index(engine):
+    from models import Show
+    query = select(Show.id, Show.show_date).where(Show.venue_id.in_([1, 2])).order_by(Show.show_date)
+    assert 'INDEX ix_shows_venue_id_show_date' in plan(engine, query)
+
+
+def test_artist_shows_use_artist_index(engine):
+    from models import Show
+    query = select(Show.id, Show.show_date).where(Show.artist_id.in_([1, 2])).order_by(Show.show_date)
+    assert 'INDEX ix_shows_artist_id_show_date' in plan(engine, query)
+
+
+def test_shows_listing_uses_date_index(engine):
+    from models import Show
+    # the keyset pagination of /shows, in (show_date, id) order after a cursor
+    query = select(Show).where(Show.show_date > '2030-01-01').order_by(Show.show_date, Show.id).limit(10)
+    assert 'INDEX ix_shows_show_date_id' in plan(engine, query)
+
+
+def test_location_lookup_uses_unique_constraint(engine):
+    from models import Location
+    index = unique_constraint_index(engine, 'locations', 'uq_locations_city_state')
+    assert index is not None
+    query = select(Location.id).where(Location.city == 'New York', Location.state == 'NY')
+    assert 'INDEX {} (city=? AND state=?)'.format(index) in plan(engine, query)
@@ -0,0 +1,30 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+#----------------------------------------------------------------------------#
+# Statement timings.
+#----------------------------------------------------------------------------#
+
+# A statement that fails never reaches after_cursor_execute: its start time must
+# not be left behind on the pooled connection it ran on.
+
+
+def test_failing_statements_leave_nothing_on_the_connection(app):
+    from flask import g
+    from models import db
+    with app.test_request_context():
+        app.extensions['instrumentation'].start_request()
+        connection = db.session.connection()
+        info = dict(connection.info)
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                connection.execute(text('SELECT * FROM no_such_table'))
+        assert connection.execute(text('SELECT 1')).scalar() == 1
+        assert connection.info == info
+        assert g.sql['count'] == 1
+        db.session.rollback()
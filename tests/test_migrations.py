@@ -0,0 +1,52 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import os
+import subprocess
+import sys
+from sqlalchemy import create_engine
+from conftest import ROOT
+
+#----------------------------------------------------------------------------#
+# Migrations.
+#----------------------------------------------------------------------------#
+
+# The other tests build their schema with create_all(): the migrations must also
+# upgrade databases holding rows.
+
+# the schema before the updated_at columns, and a row in each of its tables
+ROWS_REVISION = 'b3e87f12c9d4'
+ROWS = [
+    "INSERT INTO locations (id, city, state) VALUES (1, 'New York', 'NY')",
+    "INSERT INTO venues (id, name, location_id) VALUES (1, 'The Hall', 1)",
+    "INSERT INTO artists (id, name, location_id) VALUES (1, 'The Band', 1)",
+    "INSERT INTO genres (id, name) VALUES (1, 'Jazz')",
+    "INSERT INTO venues_genres (venue_id, genre_id) VALUES (1, 1)",
+    "INSERT INTO artists_genres (artist_id, genre_id) VALUES (1, 1)",
+    "INSERT INTO shows (id, show_date, artist_id, venue_id) VALUES (1, '2030-01-01 20:00:00', 1, 1)",
+]
+
+
+def flask_db(directory, database, *args):
+    environ = dict(os.environ, DATABASE_URL='sqlite:///' + database, PYTHONPATH=ROOT)
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'db', *args,
+                    '--directory', os.path.join(ROOT, 'migrations')],
+                   check=True, cwd=directory, env=environ, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+
+def test_upgrade_with_rows(tmp_path):
+    database = str(tmp_path / 'rows.db')
+    flask_db(str(tmp_path), database, 'upgrade', ROWS_REVISION)
+    engine = create_engine('sqlite:///' + database)
+    with engine.begin() as connection:
+        for statement in ROWS:
+            connection.exec_driver_sql(statement)
+
+    flask_db(str(tmp_path), database, 'upgrade')
+    with engine.connect() as connection:
+        for table in ('locations', 'venues', 'artists', 'shows'):
+            assert connection.exec_driver_sql(
+                'SELECT count(*) FROM {} WHERE updated_at IS NOT NULL'.format(table)).scalar() == 1
+        assert connection.exec_driver_sql('SELECT upcoming_shows_count FROM venue_show_stats').scalar() == 1
+    engine.dispose()
@@ -0,0 +1,73 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+from datetime import datetime, timedelta
+import pytest
+from conftest import fresh_database
+
+#----------------------------------------------------------------------------#
+# Query counts.
+#----------------------------------------------------------------------------#
+
+# The venue and artist pages eager-load their shows, and the listings read
+# their rows in a few set-based queries: a page runs the same statements for a
+# venue or artist with one show as for one with hundreds, and listings don't
+# grow with the number of rows.
+
+MANY_SHOWS = 300
+# statements of a venue or artist page: its freshness for conditional GETs, the
+# entity with its location, its genres, its shows with the other side
+MAX_DETAIL_STATEMENTS = 4
+
+
+@pytest.fixture
+def catalog(app):
+    # venue 1 and artist 1 have one show together, venue 2 and artist 2 have
+    # MANY_SHOWS, half of them past
+    from models import db, Location, Venue, Artist, Show
+    import stats
+    fresh_database(app)
+    with app.app_context():
+        location = Location(city='New York', state='NY')
+        db.session.add(location)
+        db.session.flush()
+        venues = [Venue(name='Venue {}'.format(i), address='1 Main Street', location_id=location.id)
+                  for i in (1, 2)]
+        artists = [Artist(name='Artist {}'.format(i), location_id=location.id) for i in (1, 2)]
+        db.session.add_all(venues + artists)
+        db.session.flush()
+        now = datetime.now()
+        shows = [Show(venue_id=venues[0].id, artist_id=artists[0].id, show_date=now + timedelta(days=1))]
+        shows += [Show(venue_id=venues[1].id, artist_id=artists[1].id,
+                       show_date=now + timedelta(days=i - MANY_SHOWS // 2)) for i in range(MANY_SHOWS)]
+        db.session.add_all(shows)
+        stats.refresh()
+        db.session.commit()
+
+
+def count_statements(client, statements, url):
+    # statements of a request, after a first one warming up per-process caches
+    client.get(url).get_data()
+    del statements[:]
+    response = client.get(url)
+    response.get_data()
+    assert response.status_code == 200
+    return len(statements)
+
+
+@pytest.mark.parametrize('url', ['/venues/{}', '/artists/{}'])
+def test_detail_page_statements_do_not_depend_on_shows(catalog, client, statements, url):
+    one_show = count_statements(client, statements, url.format(1))
+    many_shows = count_statements(client, statements, url.format(2))
+    assert many_shows == one_show
+    assert many_shows <= MAX_DETAIL_STATEMENTS
+
+
+@pytest.mark.parametrize('url', ['/venues', '/artists', '/shows'])
+def test_listing_statements_do_not_depend_on_rows(app, client, statements, url):
+    fresh_database(app, scale=1)
+    small = count_statements(client, statements, url)
+    fresh_database(app, scale=5)
+    large = count_statements(client, statements, url)
+    assert large <= small
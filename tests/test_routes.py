@@ -0,0 +1,119 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import tracemalloc
+import pytest
+from sqlalchemy import func, select
+from conftest import fresh_database
+
+#----------------------------------------------------------------------------#
+# Route benchmark.
+#----------------------------------------------------------------------------#
+
+# Drives every route of the app through the Flask test client on the synthetic
+# catalog of `flask seed` at several data scales, recording with pytest-benchmark
+# the latency of each route, and its statement count and peak memory as extra
+# info. A route fails when it answers an error, or when it runs more statements
+# at a larger scale than at the smallest one: the statement count of a page must
+# not depend on the amount of data.
+#   pytest tests/test_routes.py --benchmark-columns=median,rounds
+
+SCALES = [1, 5, 20]
+ROUNDS = 5
+
+VENUE = {'name': 'Benchmark Hall', 'city': 'New York', 'state': 'NY', 'address': '1 Main Street',
+         'phone': '+1-212-555-0100', 'genres': ['Jazz', 'Blues'], 'facebook_link': 'https://facebook.com/hall',
+         'website_link': 'https://hall.example.com', 'seeking_talent': 'y', 'seeking_description': 'Bands'}
+ARTIST = {'name': 'Benchmark Band', 'city': 'Chicago', 'state': 'IL', 'phone': '+1-312-555-0100',
+          'genres': ['Rock n Roll'], 'facebook_link': 'https://facebook.com/band',
+          'website_link': 'https://band.example.com', 'seeking_venue': 'y', 'seeking_description': 'Venues'}
+SHOW = {'venue_id': '1', 'artist_id': '1', 'start_time': '2030-01-01 20:00:00'}
+
+
+def last_venue_url(path):
+    # url of the last venue, the benchmark deletes the ones it created
+    def url():
+        from models import db, Venue
+        return path.format(db.session.execute(select(func.max(Venue.id))).scalar())
+    return url
+
+
+# (name, method, url, form data) of every route, reads first
+ROUTES = [
+    ('home', 'GET', '/', None),
+    ('venues', 'GET', '/venues', None),
+    ('venues by genre', 'GET', '/venues?genre=Jazz', None),
+    ('venue', 'GET', '/venues/1', None),
+    ('search venues', 'POST', '/venues/search', {'search_term': 'blue'}),
+    ('artists', 'GET', '/artists', None),
+    ('artists by genre', 'GET', '/artists?genre=Jazz', None),
+    ('artist', 'GET', '/artists/1', None),
+    ('search artists', 'POST', '/artists/search', {'search_term': 'blue'}),
+    ('shows', 'GET', '/shows', None),
+    ('search shows', 'POST', '/shows/search', {'search_term': 'blue'}),
+    ('search all', 'GET', '/search?search_term=blue', None),
+    ('api venues', 'GET', '/api/v1/venues?include=location,shows,genres', None),
+    ('api artist', 'GET', '/api/v1/artists/1?include=shows,genres', None),
+    ('api shows', 'GET', '/api/v1/shows?include=venue,artist', None),
+    ('api locations', 'GET', '/api/v1/locations?include=venues,artists', None),
+    ('export shows', 'GET', '/export/shows.csv', None),
+    ('export venues', 'GET', '/export/venues.jsonl.gz', None),
+    ('cache stats', 'GET', '/cache/stats', None),
+    ('metrics', 'GET', '/metrics', None),
+    ('new venue form', 'GET', '/venues/create', None),
+    ('new artist form', 'GET', '/artists/create', None),
+    ('new show form', 'GET', '/shows/create', None),
+    ('edit venue form', 'GET', '/venues/1/edit', None),
+    ('edit artist form', 'GET', '/artists/1/edit', None),
+    ('create venue', 'POST', '/venues/create', VENUE),
+    ('create artist', 'POST', '/artists/create', ARTIST),
+    ('create show', 'POST', '/shows/create', SHOW),
+    ('edit venue', 'POST', '/venues/1/edit', VENUE),
+    ('edit artist', 'POST', '/artists/1/edit', ARTIST),
+    ('delete venue', 'DELETE', last_venue_url('/venues/{}'), None),
+    ('delete venue button', 'POST', last_venue_url('/venues/{}/delete'), None),
+]
+
+# route name: statements at the smallest scale
+smallest_scale_statements = {}
+
+
+@pytest.fixture(scope='module', params=SCALES, ids='x{}'.format)
+def scale(request, app):
+    # pytest runs every route at a scale before moving to the next one
+    fresh_database(app, request.param)
+    return request.param
+
+
+@pytest.mark.parametrize('name, method, url, data', ROUTES, ids=[route[0] for route in ROUTES])
+def test_route(benchmark, app, client, statements, scale, name, method, url, data):
+    counts = []
+    statuses = set()
+
+    def request():
+        with app.app_context():
+            target = url() if callable(url) else url
+        executed = len(statements)
+        response = client.open(target, method=method, data=data)
+        response.get_data()
+        counts.append(len(statements) - executed)
+        statuses.add(response.status_code)
+
+    # the first request warms up per-process caches (locations, search indexes)
+    request()
+    del counts[:]
+    benchmark.pedantic(request, rounds=ROUNDS, iterations=1)
+
+    tracemalloc.start()
+    request()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    benchmark.extra_info.update(scale=scale, statements=min(counts), peak_kb=round(peak / 1024))
+    assert max(statuses) < 400, statuses
+    if scale == SCALES[0]:
+        smallest_scale_statements[name] = min(counts)
+    elif name in smallest_scale_statements:
+        assert min(counts) <= smallest_scale_statements[name], \
+            '{} statements at x{}, {} at x{}'.format(min(counts), scale, smallest_scale_statements[name], SCALES[0])
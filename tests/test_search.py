@@ -0,0 +1,71 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import pytest
+from conftest import fresh_database
+
+#----------------------------------------------------------------------------#
+# Search.
+#----------------------------------------------------------------------------#
+
+
+@pytest.fixture
+def catalog(app):
+    fresh_database(app, scale=1)
+
+
+def test_show_search_counts_matches_past_the_last_page(app, catalog):
+    import search
+    with app.app_context():
+        count, shows = search.search_shows('a', limit=10)
+        assert count > 10 and len(shows) == 10
+        assert search.search_shows('a', limit=10, offset=100000) == (count, [])
+
+
+def test_search_all_limits_every_kind_of_result(app, catalog, client, monkeypatch):
+    monkeypatch.setitem(app.config, 'SEARCH_RESULTS_LIMIT', 3)
+    html = client.get('/search?search_term=a').get_data(as_text=True)
+    assert html.count('href="/venues/') == 3
+    assert html.count('href="/artists/') == 3
+    assert html.count('href="/shows/') == 3
+
+
+@pytest.mark.parametrize('term', ['blue', 'metal', 'new', 'NY'])
+def test_matching_ids_match_name_location_and_genres(app, catalog, term):
+    import search
+    from models import db, Venue, Artist
+    from sqlalchemy.orm import selectinload
+    with app.app_context():
+        for model, location in ((Venue, Venue.venue_location), (Artist, Artist.artist_location)):
+            found = set(db.session.execute(search.matching_ids(model, term)).scalars())
+            expected = {
+                entity.id for entity in model.query.options(selectinload(location), selectinload(model.genres))
+                if term.lower() in (entity.name or '').lower()
+                or any(term.lower() in genre.name.lower() for genre in entity.genres)
+                or (getattr(entity, location.key) is not None and (
+                    term.lower() in (getattr(entity, location.key).city or '').lower()
+                    or term.upper() == (getattr(entity, location.key).state or '').upper()))
+            }
+            assert found == expected and found
+
+
+@pytest.mark.parametrize('limit, offset', [(-5, -3), (100000, 0), (0, -100000)])
+def test_show_search_clamps_limit_and_offset(app, catalog, client, monkeypatch, limit, offset):
+    monkeypatch.setitem(app.config, 'SEARCH_RESULTS_LIMIT', 3)
+    response = client.post('/shows/search', data={'search_term': 'a', 'limit': limit, 'offset': offset})
+    assert response.status_code == 200
+    html = response.get_data(as_text=True)
+    assert 1 <= html.count('href="/shows/') <= 3
+
+
+def test_show_search_matches_artist_or_venue_names(app, catalog):
+    import search
+    from models import Show
+    from sqlalchemy.orm import joinedload
+    with app.app_context():
+        count, shows = search.search_shows('blue')
+        shows_with_names = Show.query.options(joinedload(Show.artist_shows), joinedload(Show.venue_shows))
+        expected = {show.id for show in shows_with_names
+                    if 'blue' in show.artist_shows.name.lower() or 'blue' in show.venue_shows.name.lower()}
+        assert expected and count == len(expected) and {show['id'] for show in shows} == expected
@@ -0,0 +1,38 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import pytest
+from sqlalchemy import func, select
+from conftest import fresh_database
+
+#----------------------------------------------------------------------------#
+# Venue pages.
+#----------------------------------------------------------------------------#
+
+VENUE = {'name': 'The Edited Hall', 'city': 'New York', 'state': 'NY', 'address': '1 Main Street',
+         'phone': '+1-212-555-0100', 'genres': ['Jazz'], 'facebook_link': 'https://facebook.com/hall',
+         'website_link': 'https://hall.example.com', 'seeking_talent': 'y', 'seeking_description': 'Bands'}
+
+
+@pytest.fixture
+def catalog(app):
+    fresh_database(app, scale=1)
+
+
+def test_edit_venue_renders_the_venue_page(catalog, client):
+    response = client.post('/venues/1/edit', data=VENUE)
+    html = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert 'Venue The Edited Hall was successfully updated!' in html
+    assert 'action="/venues/1/delete"' in html
+
+
+def test_delete_button_deletes_the_venue_and_its_shows(app, catalog, client):
+    from models import db, Venue, Show
+    assert client.get('/venues/1/delete').status_code == 405
+    response = client.post('/venues/1/delete')
+    assert response.status_code == 302
+    with app.app_context():
+        assert db.session.get(Venue, 1) is None
+        assert db.session.execute(select(func.count(Show.id)).where(Show.venue_id == 1)).scalar() == 0
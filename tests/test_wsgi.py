@@ -0,0 +1,27 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import pytest
+
+#----------------------------------------------------------------------------#
+# Production entry point.
+#----------------------------------------------------------------------------#
+
+# Outside debug mode, the workers must share SECRET_KEY to accept each other's
+# sessions and CSRF tokens: the production app refuses to start without it.
+
+
+def test_requires_secret_key_outside_debug(app, monkeypatch):
+    import wsgi
+    monkeypatch.delenv('SECRET_KEY')
+    monkeypatch.setattr(app, 'debug', False)
+    with pytest.raises(RuntimeError, match='SECRET_KEY'):
+        wsgi.create_app()
+
+
+def test_starts_without_secret_key_in_debug(app, monkeypatch):
+    import wsgi
+    monkeypatch.delenv('SECRET_KEY')
+    monkeypatch.setattr(app, 'debug', True)
+    assert wsgi.create_app() is app
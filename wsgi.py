@@ -0,0 +1,33 @@
+#----------------------------------------------------------------------------#
+# Imports
+#----------------------------------------------------------------------------#
+
+import os
+from assets import load_manifest
+from locations import warm_location_cache
+from templating import precompile_templates
+
+#----------------------------------------------------------------------------#
+# Production entry point.
+#----------------------------------------------------------------------------#
+
+# Served by gunicorn with `gunicorn -c gunicorn.conf.py wsgi:app`, configured from
+# the environment by config.py (DATABASE_URL, DB_POOL_SIZE, ...). Each worker
+# imports this module after the fork, so it gets its own connection pool.
+# SECRET_KEY is required: without it every worker would sign sessions and CSRF
+# tokens with its own random key, rejecting those of the others.
+
+
+def create_app():
+    # the app, with its per-process caches warmed before the first request
+    from app import app
+    if not app.debug and not os.getenv('SECRET_KEY'):
+        raise RuntimeError('SECRET_KEY must be set outside debug mode')
+    with app.app_context():
+        warm_location_cache()
+    precompile_templates(app)
+    load_manifest(app)
+    return app
+
+
+app = create_app()